@@ -0,0 +1,192 @@
+"""
+Сборка статических файлов для продакшена (flask assets-build).
+
+Файлы из static/ копируются в static/dist/ под именами с хешем содержимого
+(style.3f2a9c1b04de.css), поэтому их можно кэшировать навсегда: при изменении файла
+меняется и его адрес. Для текстовых файлов рядом кладутся сжатые копии .br и .gz,
+шрифты OTF/TTF дополнительно конвертируются в WOFF2 с подмножеством символов.
+manifest.json связывает исходное имя с собранным файлом; запись устаревает,
+если исходный файл изменился после сборки.
+
+brotli и fontTools - необязательные зависимости: без них сборка пропускает .br и WOFF2.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+ASSETS_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.otf', '.ttf'}
+FONT_FORMATS = {'.otf': 'opentype', '.ttf': 'truetype', '.woff2': 'woff2'}
+# Сжатая копия сохраняется, только если она хотя бы на 10% меньше исходного файла
+MIN_COMPRESSION_RATIO = 0.9
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Символы, которые остаются в WOFF2: латиница, кириллица, типографские знаки, № и ₽
+FONT_SUBSET_UNICODES = 'U+0020-007E,U+00A0-00FF,U+0400-045F,U+2010-2027,U+2030-203A,U+2116,U+20BD'
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)(\s*format\([^)]*\))?')
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{file_hash(data)[:12]}{ext}'
+
+
+def convert_font_to_woff2(path):
+    """WOFF2 с подмножеством символов FONT_SUBSET_UNICODES или None без fontTools/brotli"""
+    if font_subset is None or brotli is None:
+        return None
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    font = font_subset.load_font(path, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=font_subset.parse_unicodes(FONT_SUBSET_UNICODES))
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font_subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+def compress_variants(data):
+    """Сжатые копии {кодировка: байты}; gzip без даты в заголовке, чтобы сборка была воспроизводимой"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: compressed for encoding, compressed in variants.items()
+            if len(compressed) <= len(data) * MIN_COMPRESSION_RATIO}
+
+
+def rewrite_css_urls(css, css_name, built):
+    """
+    Заменяет в CSS ссылки url(...) на собранные файлы. Для шрифта, у которого есть
+    WOFF2, ссылка превращается в список: сначала WOFF2, затем исходный формат.
+    """
+    base = os.path.dirname(css_name)
+
+    def replace(match):
+        url = match.group(2).strip()
+        name = os.path.normpath(os.path.join(base, url)).replace(os.sep, '/')
+        if name not in built:
+            return match.group(0)
+
+        def reference(target):
+            relative = os.path.relpath(built[target], os.path.join(ASSETS_DIR, base)).replace(os.sep, '/')
+            return f'url("{relative}")'
+
+        def font_reference(target):
+            return f'{reference(target)} format("{FONT_FORMATS[os.path.splitext(target)[1]]}")'
+
+        woff2 = os.path.splitext(name)[0] + '.woff2'
+        if name != woff2 and woff2 in built:
+            return f'{font_reference(woff2)}, {font_reference(name)}'
+        return reference(name) + (match.group(3) or '')
+
+    return CSS_URL.sub(replace, css)
+
+
+def build_assets(static_folder):
+    """
+    Собирает static/ в static/dist/ и пишет манифест.
+    Возвращает манифест: {исходное имя: {'file', 'source', 'source_hash', 'size', 'encodings': {кодировка: размер}}}.
+    """
+    output = os.path.join(static_folder, ASSETS_DIR)
+    shutil.rmtree(output, ignore_errors=True)
+    os.makedirs(output)
+
+    sources = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [name for name in dirs if name != ASSETS_DIR]
+        for filename in files:
+            path = os.path.join(root, filename)
+            sources[os.path.relpath(path, static_folder).replace(os.sep, '/')] = path
+
+    contents = {}
+    source_hashes = {}
+    for name, path in list(sources.items()):
+        with open(path, 'rb') as source_file:
+            contents[name] = source_file.read()
+        source_hashes[name] = file_hash(contents[name])
+        if os.path.splitext(name)[1] in ('.otf', '.ttf'):
+            woff2 = convert_font_to_woff2(path)
+            if woff2 is not None:
+                woff2_name = os.path.splitext(name)[0] + '.woff2'
+                contents[woff2_name] = woff2
+                # WOFF2 устаревает вместе с исходным шрифтом
+                source_hashes[woff2_name] = source_hashes[name]
+                sources[woff2_name] = path
+
+    manifest = {}
+    built = {}
+    # CSS собирается последним: в него подставляются уже известные имена остальных файлов
+    for name in sorted(contents, key=lambda item: item.endswith('.css')):
+        data = contents[name]
+        if name.endswith('.css'):
+            data = rewrite_css_urls(data.decode('utf-8'), name, built).encode('utf-8')
+        built[name] = f'{ASSETS_DIR}/{hashed_name(name, data)}'
+        target = os.path.join(static_folder, built[name])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as target_file:
+            target_file.write(data)
+
+        encodings = {}
+        if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+            for encoding, compressed in compress_variants(data).items():
+                with open(target + ENCODING_SUFFIXES[encoding], 'wb') as target_file:
+                    target_file.write(compressed)
+                encodings[encoding] = len(compressed)
+        manifest[name] = {'file': built[name], 'source': os.path.relpath(sources[name], static_folder),
+                          'source_hash': source_hashes[name], 'size': len(data), 'encodings': encodings}
+
+    with open(os.path.join(output, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """
+    Читает манифест собранных файлов. Записи, исходный файл которых изменился после сборки,
+    пропускаются - такие файлы отдаются по обычному адресу до следующей сборки.
+    """
+    try:
+        with open(os.path.join(static_folder, ASSETS_DIR, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+    current = {}
+    for name, entry in manifest.items():
+        try:
+            with open(os.path.join(static_folder, entry['source']), 'rb') as source_file:
+                if file_hash(source_file.read()) == entry['source_hash']:
+                    current[name] = entry
+        except OSError:
+            continue
+    return current
+
+
+def choose_encoding(accept_encodings, available):
+    """Лучшая из сжатых копий, которую принимает клиент: brotli, затем gzip; None - без сжатия"""
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accept_encodings[encoding] > 0:
+            return encoding
+    return None
@@ -0,0 +1,7 @@
+"""
+Бенчмарки Meow Blog.
+
+python -m benchmarks micro  - микробенчмарки функций и рендеринга шаблонов
+python -m benchmarks load   - нагрузочный прогон маршрутов через тестовый клиент Flask
+Отдельные сценарии: benchmarks/bench_*.py
+"""
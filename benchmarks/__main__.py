@@ -0,0 +1,63 @@
+"""
+Запуск набора бенчмарков: python -m benchmarks {micro,load} [параметры]
+
+Данные генерируются с фиксированным --seed, поэтому прогоны воспроизводимы.
+--output сохраняет результаты в JSON, --baseline сравнивает их с прошлым прогоном;
+при регрессии больше --threshold процесс завершается с кодом 1.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import micro, load  # noqa: E402
+from benchmarks.report import write_results, compare_with_baseline  # noqa: E402
+
+# Метрики, по которым ищутся регрессии (больше - хуже)
+COMPARED_METRICS = {
+    'micro': ['us_per_call'],
+    'load': ['p50', 'p95', 'queries'],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='kind', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--users', type=int, default=20)
+    common.add_argument('--articles', type=int, default=2000)
+    common.add_argument('--comments', type=int, default=5, help='комментариев на статью')
+    common.add_argument('--seed', type=int, default=42)
+    common.add_argument('--output', help='файл для результатов в JSON')
+    common.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    common.add_argument('--threshold', type=float, default=0.2, help='допустимый рост метрики (0.2 = 20%%)')
+
+    micro_parser = subparsers.add_parser('micro', parents=[common], help='микробенчмарки функций и шаблонов')
+    micro_parser.add_argument('--repeat', type=int, default=5)
+    micro_parser.add_argument('--scale', type=float, default=1.0, help='множитель числа вызовов в замере')
+
+    load_parser = subparsers.add_parser('load', parents=[common], help='нагрузочный прогон маршрутов')
+    load_parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    load_parser.add_argument('--concurrency', type=int, default=4)
+    load_parser.add_argument('--requests', type=int, default=50, help='запросов на воркер для каждого маршрута')
+    load_parser.add_argument('--warmup', type=int, default=5)
+    load_parser.add_argument('--routes', help='имена маршрутов через запятую (по умолчанию все)')
+    load_parser.add_argument('--login', action='store_true', help='запросы от имени администратора')
+    load_parser.add_argument('--page-cache', choices=['none', 'memory', 'file'], default='none')
+
+    args = parser.parse_args()
+    results = (micro if args.kind == 'micro' else load).run(args)
+
+    if args.output:
+        params = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+        write_results(args.output, args.kind, params, results)
+        print(f'\nРезультаты записаны в {args.output}')
+    if args.baseline and compare_with_baseline(args.baseline, results, COMPARED_METRICS[args.kind], args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Бенчмарк каталога статей в памяти (ARTICLE_CATALOG).
+
+Для каждого размера архива: память каталога на статью (tracemalloc), время загрузки,
+латентность страниц списка /news (первая и глубокая) и /category/<slug> с каталогом
+и без него и число SQL-запросов на страницу.
+
+Запуск: python benchmarks/bench_catalog.py [--sizes 10000 100000 --requests 200]
+"""
+import argparse
+import os
+import re
+import sys
+import time as timer
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import create_bench_app, generate_data  # noqa: E402
+from benchmarks.report import percentiles  # noqa: E402
+from catalog import ArticleCatalog  # noqa: E402
+from main import db, DEFAULT_CATEGORIES, load_catalog  # noqa: E402
+
+DEEP_PAGES = 20
+
+
+def measure_memory(app):
+    """Байт каталога на статью и время полной загрузки"""
+    with app.app_context():
+        catalog = ArticleCatalog()
+        tracemalloc.start()
+        started = timer.perf_counter()
+        load_catalog(catalog)
+        seconds = timer.perf_counter() - started
+        # Строки результата запроса к этому моменту освобождены - остается только каталог
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return used / max(len(catalog), 1), seconds, len(catalog)
+
+
+def deep_page_path(client):
+    """Адрес страницы /news через DEEP_PAGES переходов по ссылке "старее" """
+    path = '/news'
+    for _ in range(DEEP_PAGES):
+        match = re.search(r'href="([^"]*before=[^"]*)"', client.get(path).get_data(as_text=True))
+        if not match:
+            break
+        path = match.group(1).replace('&amp;', '&')
+    return path
+
+
+def measure_pages(app, paths, requests):
+    client = app.test_client()
+    results = {}
+    for name, path in paths.items():
+        client.get(path)
+        samples = []
+        queries = None
+        for _ in range(requests):
+            started = timer.perf_counter()
+            response = client.get(path)
+            samples.append((timer.perf_counter() - started) * 1000)
+            queries = response.headers.get('X-Query-Count', '-')
+        stats = percentiles(samples)
+        results[name] = (stats['p50'], stats['p95'], queries)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        app = create_bench_app('bench_catalog_', {'VIEW_COUNTER_BACKEND': 'none'})
+        with app.app_context():
+            generate_data(users=50, articles=size, comments_per_article=0)
+            uri = app.config['SQLALCHEMY_DATABASE_URI']
+        per_article, load_seconds, loaded = measure_memory(app)
+        print(f'Статей: {loaded}; каталог: {per_article:.0f} байт на статью, '
+              f'{per_article * loaded / 2 ** 20:.1f} МБ, загрузка {load_seconds * 1000:.0f} мс')
+
+        paths = {'/news': '/news', 'глубокая': deep_page_path(app.test_client()),
+                 'категория': f'/category/{DEFAULT_CATEGORIES[0][1]}'}
+        print(f'{"страница":>12} {"режим":>8} {"p50, мс":>9} {"p95, мс":>9} {"запросов":>9}')
+        for mode, catalog in (('база', False), ('каталог', True)):
+            mode_app = app if not catalog else create_bench_app(
+                'bench_catalog_', {'SQLALCHEMY_DATABASE_URI': uri, 'VIEW_COUNTER_BACKEND': 'none',
+                                   'ARTICLE_CATALOG': True})
+            for name, (p50, p95, queries) in measure_pages(mode_app, paths, args.requests).items():
+                print(f'{name:>12} {mode:>8} {p50:>9.2f} {p95:>9.2f} {queries:>9}')
+        with app.app_context():
+            db.engine.dispose()
+        print()
+
+
+if __name__ == '__main__':
+    main()
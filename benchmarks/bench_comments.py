@@ -0,0 +1,82 @@
+"""
+Бенчмарк записи комментариев к одной "горячей" статье: синхронный коммит в запросе
+против очереди с групповым коммитом (COMMENT_WRITE_MODE='queue').
+
+Писатели параллельно отправляют POST /news/<id> через тестовый клиент; в конце
+проверяется, что comment_count статьи совпадает с числом записанных комментариев.
+
+Запуск: python benchmarks/bench_comments.py [--writers 16 --comments 100]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import create_bench_app, generate_data  # noqa: E402
+from benchmarks.report import percentiles  # noqa: E402
+from main import db, Article, Comment  # noqa: E402
+
+
+def run(mode, writers, comments, articles):
+    app = create_bench_app(f'bench_comments_{mode}_', {'COMMENT_WRITE_MODE': mode, 'VIEW_COUNTER_BACKEND': 'none'})
+    with app.app_context():
+        generate_data(users=2, articles=articles, comments_per_article=0)
+        article_id = db.session.execute(db.select(Article.id).limit(1)).scalar()
+
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def writer(number):
+        client = app.test_client()
+        samples, failed = [], 0
+        for i in range(comments):
+            started = timer.perf_counter()
+            response = client.post(f'/news/{article_id}',
+                                   data={'author_name': f'Писатель {number}', 'text': f'Комментарий номер {i}'})
+            samples.append((timer.perf_counter() - started) * 1000)
+            if response.status_code != 302:
+                failed += 1
+        with lock:
+            latencies.extend(samples)
+            failures.append(failed)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    started = timer.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = timer.perf_counter() - started
+
+    if 'comment_queue' in app.extensions:
+        app.extensions['comment_queue'].close()
+    with app.app_context():
+        stored = db.session.execute(db.select(db.func.count()).select_from(Comment)).scalar()
+        counted = db.session.get(Article, article_id).comment_count
+    stats = percentiles(latencies)
+    return {'rate': stored / seconds, 'p50': stats['p50'], 'p95': stats['p95'],
+            'mean': statistics.mean(latencies), 'failed': sum(failures), 'stored': stored, 'counted': counted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--comments', type=int, default=100, help='комментариев на писателя')
+    parser.add_argument('--articles', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f'Писателей: {args.writers}, комментариев на писателя: {args.comments}')
+    print(f'{"режим":>8} {"комм./с":>9} {"p50, мс":>9} {"p95, мс":>9} {"ошибок":>7} {"записано":>9} {"счетчик":>8}')
+    for mode in ('sync', 'queue'):
+        result = run(mode, args.writers, args.comments, args.articles)
+        print(f'{mode:>8} {result["rate"]:>9.1f} {result["p50"]:>9.2f} {result["p95"]:>9.2f} '
+              f'{result["failed"]:>7} {result["stored"]:>9} {result["counted"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
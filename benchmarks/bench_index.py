@@ -0,0 +1,83 @@
+"""
+Бенчмарк главной страницы: задержка GET / в зависимости от размера архива.
+
+Число сегодняшних статей постоянно, растёт только архив старых статей,
+поэтому при запросе по индексу created_date задержка должна оставаться ровной.
+
+Запуск: python benchmarks/bench_index.py [--sizes 1000,10000,100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time as timer
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import create_bench_app, create_bench_user, bench_category_id  # noqa: E402
+from main import db, Article, get_local_datetime  # noqa: E402
+
+TODAY_ARTICLES = 20
+
+
+def seed_archive(count, user_id, category_id, start_index):
+    """Добавляет count старых статей (от 1 до 365 дней назад) пачками"""
+    now = get_local_datetime()
+    batch = []
+    for i in range(start_index, start_index + count):
+        batch.append({
+            'title': f'Архивная статья {i}',
+            'text': 'Текст архивной статьи ' * 10,
+            'excerpt': 'архив...',
+            'category_id': category_id,
+            'user_id': user_id,
+            'created_date': now - timedelta(days=1 + i % 365, minutes=i % 1440),
+        })
+        if len(batch) >= 10000:
+            db.session.execute(Article.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Article.__table__.insert(), batch)
+    db.session.commit()
+
+
+def measure(client, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        response = client.get('/')
+        samples.append((timer.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    app = create_bench_app('bench_index_')
+    client = app.test_client()
+    with app.app_context():
+        user_id = create_bench_user().id
+        category_id = bench_category_id()
+        for i in range(TODAY_ARTICLES):
+            db.session.add(Article(title=f'Сегодняшняя статья {i}', text='Текст', excerpt='...',
+                                   category_id=category_id, user_id=user_id))
+        db.session.commit()
+
+        print(f'Сегодняшних статей: {TODAY_ARTICLES}')
+        print(f'{"архив":>10} {"медиана, мс":>12} {"максимум, мс":>13}')
+        seeded = 0
+        for size in sizes:
+            seed_archive(size - seeded, user_id, category_id, seeded)
+            seeded = size
+            median, worst = measure(client, args.repeat)
+            print(f'{size:>10} {median:>12.2f} {worst:>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Бенчмарк поиска: FTS5 (search_articles) против наивного LIKE '%q%' по статьям.
+
+Запуск: python benchmarks/bench_search.py [--articles 100000]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import create_bench_app, create_bench_user, bench_category_id  # noqa: E402
+from main import db, Article, search_articles  # noqa: E402
+
+SYLLABLES = 'ка ко ми ра но ту ле си да во пе ры жу ба го ни ло ше ха фе'.split()
+VOCABULARY_SIZE = 20000
+
+
+def build_vocabulary(rng):
+    """Синтетический словарь; частоты слов распределены по закону Ципфа, как в реальных текстах"""
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def random_text(rng, vocabulary, weights, words):
+    return ' '.join(rng.choices(vocabulary, cum_weights=weights, k=words))
+
+
+def seed_articles(count, user_id):
+    rng = random.Random(42)
+    vocabulary = build_vocabulary(rng)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    category_id = bench_category_id()
+    batch = []
+    for i in range(count):
+        batch.append({
+            'title': random_text(rng, vocabulary, weights, 5),
+            'text': random_text(rng, vocabulary, weights, 120),
+            'excerpt': random_text(rng, vocabulary, weights, 12),
+            'category_id': category_id,
+            'user_id': user_id,
+        })
+        if len(batch) >= 10000:
+            db.session.execute(Article.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Article.__table__.insert(), batch)
+    db.session.commit()
+    # Запросы из слов разной частоты: частое, среднее, редкое, префикс и отсутствующее слово
+    return [vocabulary[10], f'{vocabulary[300]} {vocabulary[500]}', vocabulary[5000],
+            vocabulary[2000][:-1], 'отсутствующееслово']
+
+
+def like_search(query, limit):
+    pattern = f'%{query}%'
+    return db.session.execute(
+        db.select(Article.id)
+        .where(db.or_(Article.title.like(pattern), Article.excerpt.like(pattern), Article.text.like(pattern)))
+        .order_by(Article.created_date.desc())
+        .limit(limit)
+    ).all()
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        func()
+        samples.append((timer.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_bench_app('bench_search_')
+    with app.app_context():
+        user = create_bench_user()
+
+        started = timer.perf_counter()
+        queries = seed_articles(args.articles, user.id)
+        print(f'Статей: {args.articles}, заполнение с индексацией: {timer.perf_counter() - started:.1f} с')
+
+        with app.test_request_context():
+            per_page = app.config['ARTICLES_PER_PAGE']
+            print(f'{"запрос":>22} {"FTS5, мс":>10} {"LIKE, мс":>10}')
+            for query in queries:
+                fts = measure(lambda: search_articles(query), args.repeat)
+                like = measure(lambda: like_search(query, per_page + 1), args.repeat)
+                print(f'{query:>22} {fts:>10.2f} {like:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
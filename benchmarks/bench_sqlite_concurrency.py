@@ -0,0 +1,91 @@
+"""
+Бенчмарк конкурентных чтений и записей в файловую базу SQLite.
+
+Читатели открывают /news через тестовый клиент, писатели добавляют комментарии.
+Сравниваются настройки SQLite по умолчанию и профиль DEFAULT_SQLITE_PRAGMAS (WAL и др.).
+
+Запуск: python benchmarks/bench_sqlite_concurrency.py [--readers 8 --writers 4 --seconds 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from benchmarks.datagen import create_bench_app, create_bench_user, bench_category_id  # noqa: E402
+from main import db, Article, Comment, DEFAULT_SQLITE_PRAGMAS  # noqa: E402
+
+
+def prepare_app(pragmas):
+    app = create_bench_app('bench_sqlite_', {'SQLITE_PRAGMAS': pragmas})
+    with app.app_context():
+        user = create_bench_user()
+        category_id = bench_category_id()
+        db.session.execute(Article.__table__.insert(), [
+            {'title': f'Статья {i}', 'text': 'Текст статьи ' * 20, 'excerpt': '...',
+             'category_id': category_id, 'user_id': user.id}
+            for i in range(1000)
+        ])
+        db.session.commit()
+    return app
+
+
+def run(app, readers, writers, seconds):
+    stop_at = timer.perf_counter() + seconds
+    counters = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        client = app.test_client()
+        done = 0
+        while timer.perf_counter() < stop_at:
+            assert client.get('/news').status_code == 200
+            done += 1
+        with lock:
+            counters['reads'] += done
+
+    def writer():
+        done = errors = 0
+        while timer.perf_counter() < stop_at:
+            with app.app_context():
+                try:
+                    db.session.add(Comment(text='Комментарий бенчмарка', author_name='Бенчмарк', article_id=1))
+                    db.session.commit()
+                    done += 1
+                except OperationalError:
+                    db.session.rollback()
+                    errors += 1
+        with lock:
+            counters['writes'] += done
+            counters['errors'] += errors
+
+    threads = ([threading.Thread(target=reader) for _ in range(readers)] +
+               [threading.Thread(target=writer) for _ in range(writers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'Читателей: {args.readers}, писателей: {args.writers}, длительность: {args.seconds} с')
+    print(f'{"профиль":>12} {"чтений/с":>10} {"записей/с":>10} {"ошибок":>8}')
+    for name, pragmas in (('default', {}), ('tuned', DEFAULT_SQLITE_PRAGMAS)):
+        counters = run(prepare_app(pragmas), args.readers, args.writers, args.seconds)
+        print(f'{name:>12} {counters["reads"] / args.seconds:>10.1f} '
+              f'{counters["writes"] / args.seconds:>10.1f} {counters["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
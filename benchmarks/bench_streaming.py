@@ -0,0 +1,109 @@
+"""
+Бенчмарк потокового рендеринга (STREAM_TEMPLATES) и сжатия ответов на лету (RESPONSE_COMPRESSION).
+
+Большая страница списка (/news со всеми статьями на одной странице) отдается в четырех
+режимах: целиком или потоком, без сжатия или с gzip. Для каждого режима измеряются время
+до первого байта тела (TTFB), полное время ответа, размер тела и пик
+памяти Python за запрос (tracemalloc). Каждый режим запускается в отдельном процессе,
+как отдельный воркер.
+
+Запуск: python benchmarks/bench_streaming.py [--articles 5000 --requests 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time as timer
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from benchmarks.datagen import create_bench_app, generate_data  # noqa: E402
+
+PATH = '/news'
+MODES = [
+    ('целиком', False, False),
+    ('поток', True, False),
+    ('целиком+gzip', False, True),
+    ('поток+gzip', True, True),
+]
+
+
+def timed_request(app, path):
+    """Вызывает WSGI-приложение напрямую: (мс до первой части тела, мс всего, байт тела)"""
+    environ = EnvironBuilder(path=path, headers={'Accept-Encoding': 'gzip'}).get_environ()
+    started = timer.perf_counter()
+    body = app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    first = None
+    size = 0
+    try:
+        for chunk in body:
+            if first is None and chunk:
+                first = timer.perf_counter()
+            size += len(chunk)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    finished = timer.perf_counter()
+    return (first - started) * 1000, (finished - started) * 1000, size
+
+
+def run_worker(database_uri, per_page, stream, compression, requests):
+    """Выполняется в дочернем процессе: прогрев, затем замеры одного режима"""
+    from main import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri, 'PAGE_CACHE_BACKEND': 'none',
+                      'VIEW_COUNTER_BACKEND': 'none', 'ARTICLES_PER_PAGE': per_page,
+                      'STREAM_TEMPLATES': stream, 'RESPONSE_COMPRESSION': compression})
+    timed_request(app, PATH)
+    samples = [timed_request(app, PATH) for _ in range(requests)]
+    # Пик памяти - отдельным запросом: tracemalloc замедляет выполнение и исказил бы время
+    tracemalloc.start()
+    timed_request(app, PATH)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        'ttfb': statistics.median(sample[0] for sample in samples),
+        'total': statistics.median(sample[1] for sample in samples),
+        'size': samples[-1][2],
+        'peak': peak / 2 ** 20,
+    }))
+
+
+def spawn(database_uri, per_page, stream, compression, requests):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', database_uri, str(per_page),
+                             '1' if stream else '0', '1' if compression else '0', str(requests)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--worker', nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        database_uri, per_page, stream, compression, requests = args.worker
+        run_worker(database_uri, int(per_page), stream == '1', compression == '1', int(requests))
+        return
+
+    app = create_bench_app('bench_streaming_', {'VIEW_COUNTER_BACKEND': 'none'})
+    with app.app_context():
+        generate_data(users=50, articles=args.articles, comments_per_article=0)
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+
+    print(f'{PATH}: {args.articles} статей на странице, запросов на режим: {args.requests} (медианы)')
+    print(f'{"режим":>14} {"TTFB, мс":>9} {"всего, мс":>10} {"тело, КБ":>9} {"пик памяти, МБ":>15}')
+    for name, stream, compression in MODES:
+        result = spawn(database_uri, args.articles, stream, compression, args.requests)
+        print(f'{name:>14} {result["ttfb"]:>9.1f} {result["total"]:>10.1f} '
+              f'{result["size"] / 1024:>9.0f} {result["peak"]:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Бенчмарк первого запроса нового воркера: холодный старт против кэша байткода Jinja и прогрева.
+
+Каждый вариант запускается в отдельном процессе, как новый воркер после деплоя:
+измеряются время create_app, первый и повторный запрос к нескольким страницам.
+Варианты: без кэша и прогрева; с заполненным кэшем байткода; с прогревом; с кэшем и прогревом.
+
+Запуск: python benchmarks/bench_warmup.py [--articles 2000 --runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import create_bench_app, generate_data  # noqa: E402
+
+ROUTES = ['/', '/news', '/news/1', '/category/moda', '/search?q=кот']
+SCENARIOS = [
+    ('холодный', False, False),
+    ('кэш байткода', True, False),
+    ('прогрев', False, True),
+    ('кэш и прогрев', True, True),
+]
+
+
+def run_worker(database_uri, cache_dir, warmup):
+    """Выполняется в дочернем процессе: создает приложение и делает первые запросы"""
+    started = timer.perf_counter()
+    from main import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri, 'PAGE_CACHE_BACKEND': 'none',
+                      'VIEW_COUNTER_BACKEND': 'none', 'JINJA_BYTECODE_CACHE_DIR': cache_dir,
+                      'TEMPLATE_WARMUP': warmup, 'TEMPLATES_AUTO_RELOAD': False})
+    startup = (timer.perf_counter() - started) * 1000
+    client = app.test_client()
+    result = {'startup': startup, 'first': {}, 'second': {}}
+    for attempt in ('first', 'second'):
+        for path in ROUTES:
+            request_started = timer.perf_counter()
+            assert client.get(path).status_code == 200
+            result[attempt][path] = (timer.perf_counter() - request_started) * 1000
+    print(json.dumps(result))
+
+
+def spawn(database_uri, cache_dir, warmup):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', database_uri,
+                             cache_dir or '', '1' if warmup else '0'],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--worker', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        database_uri, cache_dir, warmup = args.worker
+        run_worker(database_uri, cache_dir or None, warmup == '1')
+        return
+
+    app = create_bench_app('bench_warmup_', {'VIEW_COUNTER_BACKEND': 'none'})
+    with app.app_context():
+        generate_data(articles=args.articles)
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    cache_dir = tempfile.mkdtemp(prefix='bench_jinja_cache_')
+    # Первый запуск заполняет кэш байткода, как первый воркер после деплоя
+    spawn(database_uri, cache_dir, False)
+
+    print(f'Статей: {args.articles}, запусков на вариант: {args.runs} (медианы, мс)')
+    print(f'{"вариант":>16} {"create_app":>11} {"1-й запрос":>11} {"2-й запрос":>11}  (сумма по {len(ROUTES)} страницам)')
+    for name, use_cache, warmup in SCENARIOS:
+        runs = [spawn(database_uri, cache_dir if use_cache else None, warmup) for _ in range(args.runs)]
+        startup = statistics.median(run['startup'] for run in runs)
+        first = statistics.median(sum(run['first'].values()) for run in runs)
+        second = statistics.median(sum(run['second'].values()) for run in runs)
+        print(f'{name:>16} {startup:>11.1f} {first:>11.1f} {second:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Генератор синтетических данных для бенчмарков.
+
+Строки вставляются пачками через таблицы настоящих моделей User, Article и Comment;
+производные поля (comment_count) заполняются сразу, поэтому база согласована без ORM-событий.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from main import (create_app, init_db, db, User, Article, Comment, Category,  # noqa: E402
+                  get_local_datetime, rebuild_search_index, article_derived_fields, recount_categories)
+
+BENCH_PASSWORD = 'password123'
+BATCH_SIZE = 10000
+WORDS = ('кот кошка новость искусство мода политика выставка картина показ подиум город музей театр '
+         'концерт выборы закон премьера коллекция дизайнер художник галерея весна осень праздник').split()
+
+
+def create_bench_app(prefix='bench_', config=None):
+    """Приложение с пустой базой во временном каталоге; рабочая база не затрагивается"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix=prefix), 'bench.db')
+    app_config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'TESTING': True, 'PAGE_CACHE_BACKEND': 'none'}
+    app_config.update(config or {})
+    app = create_app(app_config)
+    with app.app_context():
+        init_db()
+    return app
+
+
+def create_bench_user(name='Автор бенчмарка', email='bench@meowblog.ru', is_admin=False):
+    user = User(name=name, email=email, hashed_password='-', is_admin=is_admin)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def bench_category_id(slug='raznoe'):
+    """id категории из созданных init_db; нужен для вставки статей в обход ORM"""
+    return db.session.execute(db.select(Category.id).filter_by(slug=slug)).scalar_one()
+
+
+def _insert(table, rows, force=False):
+    if rows and (force or len(rows) >= BATCH_SIZE):
+        db.session.execute(table.insert(), rows)
+        rows.clear()
+
+
+def generate_data(users=10, articles=1000, comments_per_article=5, days=30, today_share=0.05, seed=42):
+    """
+    Заполняет базу: users пользователей (первый - администратор, пароль BENCH_PASSWORD),
+    articles статей, равномерно распределенных по days дням (доля today_share - сегодняшние),
+    и по comments_per_article комментариев к каждой статье. Нужен контекст приложения.
+    """
+    rng = random.Random(seed)
+    now = get_local_datetime()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    db.session.execute(User.__table__.insert(), [
+        {'name': f'Пользователь {i}', 'email': f'user{i}@meowblog.ru',
+         'hashed_password': password_hash, 'is_admin': i == 0}
+        for i in range(users)
+    ])
+    user_ids = db.session.execute(db.select(User.id)).scalars().all()
+    category_ids = db.session.execute(db.select(Category.id).order_by(Category.position)).scalars().all()
+
+    article_rows = []
+    for i in range(articles):
+        created = now - timedelta(minutes=rng.randint(0, 600)) if rng.random() < today_share \
+            else now - timedelta(days=rng.randint(1, days), minutes=rng.randint(0, 1440))
+        paragraphs = [' '.join(rng.choices(WORDS, k=50)) for _ in range(3)]
+        row = {
+            'title': ' '.join(rng.choices(WORDS, k=5)).capitalize(),
+            'text': '\n\n'.join(paragraphs),
+            'category_id': rng.choice(category_ids),
+            'user_id': rng.choice(user_ids),
+            'created_date': created,
+            'comment_count': comments_per_article,
+        }
+        # HTML, анонс и число слов, как при записи через ORM
+        row.update(article_derived_fields(row['text']))
+        article_rows.append(row)
+        _insert(Article.__table__, article_rows)
+    _insert(Article.__table__, article_rows, force=True)
+
+    comment_rows = []
+    for article_id, created in db.session.execute(db.select(Article.id, Article.created_date)):
+        for j in range(comments_per_article):
+            comment_rows.append({
+                'text': ' '.join(rng.choices(WORDS, k=20)),
+                'author_name': f'Читатель {rng.randint(1, 1000)}',
+                'article_id': article_id,
+                'date': created + timedelta(minutes=j + 1),
+            })
+            _insert(Comment.__table__, comment_rows)
+    _insert(Comment.__table__, comment_rows, force=True)
+    db.session.commit()
+    # Счетчики категорий поддерживают ORM-события, а строки вставлены напрямую
+    recount_categories()
+
+    if db.engine.dialect.name == 'sqlite':
+        rebuild_search_index()
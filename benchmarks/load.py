@@ -0,0 +1,123 @@
+"""
+Нагрузочный прогон маршрутов через тестовый клиент Flask, без сети.
+
+Маршруты прогоняются по очереди: на каждый --concurrency потоков или процессов
+отправляют по --requests запросов. Для каждого маршрута считаются p50/p95/p99,
+запросы в секунду и число SQL-запросов на HTTP-запрос (заголовок X-Query-Count).
+
+Запуск: python -m benchmarks load [--mode process --concurrency 4 --output load.json]
+"""
+import time as timer
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from benchmarks.datagen import create_bench_app, generate_data, BENCH_PASSWORD
+from benchmarks.report import percentiles
+from main import create_app, db, Article, DEFAULT_CATEGORIES, encode_cursor
+
+# Приложение процесса-воркера в режиме --mode process (создаётся в init_worker)
+_worker_app = None
+
+
+def init_worker(config):
+    global _worker_app
+    _worker_app = create_app(config)
+
+
+def build_routes(app):
+    """Маршруты для прогона: (имя, путь); идентификаторы и курсоры берутся из сгенерированных данных"""
+    with app.app_context():
+        article = db.session.execute(
+            db.select(Article.id, Article.created_date).order_by(Article.created_date.desc()).limit(1)
+        ).one()
+        deep = db.session.execute(
+            db.select(Article.id, Article.created_date)
+            .order_by(Article.created_date.desc(), Article.id.desc())
+            .offset(db.session.query(Article).count() // 2).limit(1)
+        ).one()
+        title_word = db.session.get(Article, article.id).title.split()[0].lower()
+
+    return [
+        ('index', '/'),
+        ('news', '/news'),
+        ('news_deep', f'/news?before={encode_cursor(deep.created_date, deep.id)}'),
+        ('news_article', f'/news/{article.id}'),
+        ('article_comments', f'/news/{article.id}/comments?format=json'),
+        ('category_news', f'/category/{DEFAULT_CATEGORIES[0][1]}'),
+        ('search', f'/search?q={title_word}'),
+        ('feed', '/feed.xml'),
+        ('category_feed', f'/category/{DEFAULT_CATEGORIES[0][1]}/feed.xml'),
+        ('about', '/about'),
+        ('api_articles', '/api/articles'),
+        ('api_article', f'/api/articles/{article.id}'),
+        ('api_categories', '/api/categories'),
+        ('api_comments', f'/api/articles/{article.id}/comments'),
+    ]
+
+
+def run_requests(path, count, login=False, app=None):
+    """
+    Выполняет count запросов GET path одним клиентом.
+    Возвращает (начало, конец, [(задержка мс, число SQL-запросов), ...]).
+    """
+    client = (app or _worker_app).test_client()
+    if login:
+        client.post('/login', data={'email': 'user0@meowblog.ru', 'password': BENCH_PASSWORD})
+        # Приветствие во flash отключает кэш страниц, пока не будет показано
+        client.get('/')
+    samples = []
+    started = timer.time()
+    for _ in range(count):
+        request_started = timer.perf_counter()
+        response = client.get(path)
+        elapsed = (timer.perf_counter() - request_started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path}: {response.status_code}')
+        samples.append((elapsed, int(response.headers.get('X-Query-Count', 0))))
+    return started, timer.time(), samples
+
+
+def run(args):
+    config = {'PAGE_CACHE_BACKEND': args.page_cache}
+    app = create_bench_app('bench_load_', config)
+    with app.app_context():
+        generate_data(users=args.users, articles=args.articles,
+                      comments_per_article=args.comments, seed=args.seed)
+    routes = build_routes(app)
+    if args.routes:
+        selected = set(args.routes.split(','))
+        routes = [route for route in routes if route[0] in selected]
+
+    if args.mode == 'process':
+        # Воркеры открывают ту же файловую базу, что и основной процесс
+        worker_config = {'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'TESTING': True}
+        worker_config.update(config)
+        executor = ProcessPoolExecutor(args.concurrency, initializer=init_worker, initargs=(worker_config,))
+        worker_app = None
+    else:
+        executor = ThreadPoolExecutor(args.concurrency)
+        worker_app = app
+
+    results = {}
+    print(f'Режим: {args.mode}, параллельно: {args.concurrency}, запросов на воркер: {args.requests}, '
+          f'кэш страниц: {args.page_cache}')
+    print(f'{"маршрут":>18} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"RPS":>9} {"SQL/запр":>9}')
+    with executor:
+        for name, path in routes:
+            if args.warmup:
+                for future in [executor.submit(run_requests, path, args.warmup, args.login, worker_app)
+                               for _ in range(args.concurrency)]:
+                    future.result()
+            runs = [future.result() for future in
+                    [executor.submit(run_requests, path, args.requests, args.login, worker_app)
+                     for _ in range(args.concurrency)]]
+            samples = [sample for _, _, worker_samples in runs for sample in worker_samples]
+            wall = max(finished for _, finished, _ in runs) - min(started for started, _, _ in runs)
+            latencies = [latency for latency, _ in samples]
+            stats = percentiles(latencies)
+            stats['rps'] = len(samples) / wall if wall else 0.0
+            stats['queries'] = sum(queries for _, queries in samples) / len(samples)
+            stats['requests'] = len(samples)
+            results[name] = stats
+            print(f'{name:>18} {stats["p50"]:>9.2f} {stats["p95"]:>9.2f} {stats["p99"]:>9.2f} '
+                  f'{stats["rps"]:>9.1f} {stats["queries"]:>9.1f}')
+    return results
@@ -0,0 +1,79 @@
+"""
+Микробенчмарки: сериализация статей, проверка даты, валидаторы форм и рендеринг шаблонов.
+
+Запуск: python -m benchmarks micro [--articles 1000 --output micro.json --baseline old.json]
+"""
+import timeit
+from datetime import date
+
+from flask import render_template
+from sqlalchemy.orm import joinedload
+
+from benchmarks.datagen import create_bench_app, generate_data
+from main import (db, Article, Comment, article_to_dict, comment_to_dict, is_today_article,
+                  validate_form, validate_article_form, validate_comment_form,
+                  validate_registration_form, validate_login_form, find_category, render_category_facets)
+
+
+def time_call(func, number, repeat):
+    """Лучшее из repeat замеров, мкс на вызов"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def collect_cases(app):
+    """Набор (имя, функция, число вызовов в замере); выполнять внутри test_request_context"""
+    per_page = app.config['ARTICLES_PER_PAGE']
+    articles = (Article.query.options(joinedload(Article.author))
+                .order_by(Article.created_date.desc()).limit(per_page).all())
+    article = articles[0]
+    comments = Comment.query.filter_by(article_id=article.id).all()
+    articles_dict = [article_to_dict(item) for item in articles]
+    article_dict = article_to_dict(article, with_content=True)
+    comments_dict = [comment_to_dict(comment) for comment in comments]
+    date_string = article_dict['date']
+    category = find_category(article.category.slug)
+    facets = render_category_facets(category['slug'])
+    text = article.text
+
+    return [
+        ('article_to_dict', lambda: article_to_dict(article), 10000),
+        ('article_to_dict_page', lambda: [article_to_dict(item) for item in articles], 500),
+        ('comment_to_dict', lambda: comment_to_dict(comments[0]), 10000),
+        ('is_today_article_datetime', lambda: is_today_article(article.created_date), 10000),
+        ('is_today_article_string', lambda: is_today_article(date_string), 2000),
+        ('validate_form', lambda: validate_form('Иван', 'ivan@meowblog.ru', 'Сообщение для редакции'), 10000),
+        ('validate_article_form', lambda: validate_article_form(article.title, text, article.category.slug), 10000),
+        ('validate_comment_form', lambda: validate_comment_form('Читатель', 'Отличная статья!'), 10000),
+        ('validate_login_form', lambda: validate_login_form('ivan@meowblog.ru', 'password123'), 10000),
+        # Проверка уникальности email - запрос к базе
+        ('validate_registration_form',
+         lambda: validate_registration_form('Иван', 'new@meowblog.ru', 'password123', 'password123'), 500),
+        ('render_news', lambda: render_template('news.html', articles=articles_dict, older_cursor='x',
+                                                newer_cursor=None, category_facets=facets,
+                                                current_date=date.today()), 200),
+        ('render_news_article',
+         lambda: render_template('news_article.html', article=article_dict, comments=comments_dict,
+                                 comments_older=None, current_date=date.today()), 200),
+        ('render_category_news',
+         lambda: render_template('category_news.html', articles=articles_dict, older_cursor='x',
+                                 newer_cursor=None, category=category, category_facets=facets,
+                                 current_date=date.today()), 200),
+    ]
+
+
+def run(args):
+    app = create_bench_app('bench_micro_')
+    with app.app_context():
+        generate_data(users=args.users, articles=args.articles,
+                      comments_per_article=args.comments, seed=args.seed)
+        with app.test_request_context('/'):
+            cases = collect_cases(app)
+            results = {}
+            print(f'{"функция":>28} {"мкс/вызов":>12}')
+            for name, func, number in cases:
+                func()  # прогрев: компиляция шаблонов, кэш g.today_bounds
+                per_call = time_call(func, max(1, int(number * args.scale)), args.repeat)
+                results[name] = {'us_per_call': per_call}
+                print(f'{name:>28} {per_call:>12.2f}')
+        db.session.remove()
+    return results
@@ -0,0 +1,66 @@
+"""
+Результаты бенчмарков: перцентили, запись в JSON и сравнение с сохранённым базовым прогоном.
+"""
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime
+
+
+def percentiles(samples):
+    """p50/p95/p99 по списку задержек (мс)"""
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def write_results(path, kind, params, results):
+    data = {
+        'kind': kind,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump(data, results_file, ensure_ascii=False, indent=2)
+
+
+def compare_with_baseline(path, results, metrics, threshold):
+    """
+    Печатает изменение метрик относительно базового прогона и возвращает список регрессий.
+    metrics - имена метрик, где больше значит хуже (например p95 или queries);
+    регрессия - рост больше чем на threshold (доля, 0.2 = 20%).
+    """
+    with open(path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = []
+    print(f'\nСравнение с {path}:')
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f'  {name}: нет в базовом прогоне')
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            delta = (new - old) / old if old else (0.0 if new == old else float('inf'))
+            changes.append(f'{metric} {old:.2f} -> {new:.2f} ({delta:+.0%})')
+            if delta > threshold:
+                regressions.append(f'{name}: {metric} {old:.2f} -> {new:.2f}')
+        print(f'  {name}: ' + ', '.join(changes))
+
+    if regressions:
+        print(f'\nРегрессии (порог {threshold:.0%}):')
+        for regression in regressions:
+            print(f'  {regression}')
+    else:
+        print('\nРегрессий нет')
+    return regressions
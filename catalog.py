@@ -0,0 +1,184 @@
+"""
+Компактный каталог статей в памяти процесса для страниц списков.
+
+Хранит только то, что нужно спискам (id, заголовок, дата, анонс, категория, автор,
+число слов и комментариев), в объектах с __slots__. Порядок по (created_date, id)
+поддерживается отсортированными списками ключей - общим и по категориям, поэтому
+страница списка - это bisect и срез, без SQL. Синхронизацию с базой делает приложение
+(main.get_article_catalog): каталог только применяет загруженные строки.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class AuthorRecord:
+    """Автор, общий для всех его статей в каталоге; как и модель, дает article.author.name"""
+    __slots__ = ('id', 'name')
+
+    def __init__(self, author_id, name):
+        self.id = author_id
+        self.name = name
+
+
+class CategoryRecord:
+    """Категория, общая для всех ее статей в каталоге; дает article.category.name и .slug"""
+    __slots__ = ('id', 'name', 'slug')
+
+    def __init__(self, category_id, name, slug):
+        self.id = category_id
+        self.name = name
+        self.slug = slug
+
+
+class ArticleRecord:
+    __slots__ = ('id', 'title', 'created_date', 'excerpt', 'word_count', 'user_id', 'category',
+                 'comment_count', 'author')
+
+    def __init__(self, article_id, title, created_date, excerpt, word_count, user_id, category,
+                 comment_count, author):
+        self.id = article_id
+        self.title = title
+        self.created_date = created_date
+        self.excerpt = excerpt
+        self.word_count = word_count
+        self.user_id = user_id
+        self.category = category
+        self.comment_count = comment_count
+        self.author = author
+
+    @property
+    def key(self):
+        return self.created_date, self.id
+
+
+class ArticleCatalog:
+    """
+    Статьи по id и отсортированные по возрастанию ключи (created_date, id): все и по категориям.
+    version и watermark - версия тега 'articles' и время последнего изменения из change_counters,
+    до которых каталог согласован с базой.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.version = None
+        self.watermark = None
+        self.sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._records = {}
+        self._authors = {}
+        self._categories = {}
+        self._keys = []
+        self._category_keys = {}
+        self._stale_ids = set()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _author(self, user_id, name):
+        author = self._authors.get(user_id)
+        if author is None:
+            author = self._authors[user_id] = AuthorRecord(user_id, name)
+        else:
+            author.name = name
+        return author
+
+    def _category(self, category_id, name, slug):
+        category = self._categories.get(category_id)
+        if category is None:
+            category = self._categories[category_id] = CategoryRecord(category_id, name, slug)
+        return category
+
+    def _make_record(self, row):
+        """
+        row: (id, title, created_date, excerpt, word_count, user_id, category_id, category_name,
+        category_slug, comment_count, author_name)
+        """
+        (article_id, title, created_date, excerpt, word_count, user_id, category_id, category_name,
+         category_slug, comment_count, author_name) = row
+        return ArticleRecord(article_id, title, created_date, excerpt, word_count, user_id,
+                             self._category(category_id, category_name, category_slug), comment_count,
+                             self._author(user_id, author_name))
+
+    def load(self, rows, version, watermark):
+        """Полная загрузка; rows - строки проекции в любом порядке"""
+        records = {}
+        with self._lock:
+            self._authors = {}
+            self._categories = {}
+            for row in rows:
+                record = self._make_record(row)
+                records[record.id] = record
+            keys = sorted(record.key for record in records.values())
+            category_keys = {}
+            for key in keys:
+                category_keys.setdefault(records[key[1]].category.id, []).append(key)
+            self._records, self._keys, self._category_keys = records, keys, category_keys
+            self.version, self.watermark, self.loaded = version, watermark, True
+
+    def _remove_key(self, record):
+        for keys in (self._keys, self._category_keys.get(record.category.id, [])):
+            index = bisect_left(keys, record.key)
+            if index < len(keys) and keys[index] == record.key:
+                del keys[index]
+
+    def upsert(self, row):
+        with self._lock:
+            record = self._make_record(row)
+            old = self._records.get(record.id)
+            if old is not None:
+                self._remove_key(old)
+            self._records[record.id] = record
+            insort(self._keys, record.key)
+            insort(self._category_keys.setdefault(record.category.id, []), record.key)
+
+    def remove(self, article_id):
+        with self._lock:
+            record = self._records.pop(article_id, None)
+            if record is not None:
+                self._remove_key(record)
+
+    def rename_author(self, user_id, name):
+        with self._lock:
+            if user_id in self._authors:
+                self._authors[user_id].name = name
+
+    def mark_stale(self, article_ids):
+        """Статьи, измененные в этом процессе: перечитываются из базы при следующей синхронизации"""
+        with self._lock:
+            self._stale_ids.update(article_ids)
+
+    def take_stale(self):
+        with self._lock:
+            stale, self._stale_ids = self._stale_ids, set()
+        return stale
+
+    def has_stale(self):
+        return bool(self._stale_ids)
+
+    def page(self, category_id=None, before=None, after=None, per_page=20):
+        """
+        Страница от новых к старым с теми же правилами, что и keyset-пагинация в базе:
+        before/after - ключи (created_date, id). Возвращает (записи, есть старее, есть новее).
+        """
+        with self._lock:
+            keys = self._keys if category_id is None else self._category_keys.get(category_id, [])
+            if after is not None:
+                start = bisect_right(keys, after)
+                chunk = keys[start:start + per_page + 1]
+                has_newer = len(chunk) > per_page
+                selected = list(reversed(chunk[:per_page]))
+                has_older = True
+            else:
+                end = bisect_left(keys, before) if before is not None else len(keys)
+                chunk = keys[max(0, end - per_page - 1):end][::-1]
+                has_older = len(chunk) > per_page
+                selected = chunk[:per_page]
+                has_newer = before is not None
+            return [self._records[key[1]] for key in selected], has_older, has_newer
+
+    def between(self, start, end):
+        """Статьи с start <= created_date < end, от новых к старым"""
+        with self._lock:
+            first = bisect_left(self._keys, (start,))
+            last = bisect_left(self._keys, (end,))
+            return [self._records[key[1]] for key in reversed(self._keys[first:last])]
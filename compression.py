@@ -0,0 +1,102 @@
+"""
+Сжатие ответов на лету (RESPONSE_COMPRESSION) и склейка частей потокового ответа.
+
+Кодировка выбирается по Accept-Encoding: brotli, затем gzip. Обычный ответ сжимается
+целиком, потоковый - по частям: каждая часть сжимается и сбрасывается (flush), поэтому
+клиент может распаковать и показать начало страницы, не дожидаясь конца. Ответы меньше
+минимального размера не сжимаются: выигрыш меньше накладных расходов и задержки.
+
+brotli - необязательная зависимость: без него ответы сжимаются только gzip.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+# Для сжатия на лету - быстрое качество; собранная статика сжимается заранее с качеством 11
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/xml', 'text/csv', 'text/javascript',
+    'application/json', 'application/xml', 'application/atom+xml', 'application/x-ndjson',
+    'application/javascript', 'image/svg+xml',
+}
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class StreamCompressor:
+    """Сжатие потока частями; после каждой части сжатые данные можно сразу отправлять"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 - формат gzip (заголовок и контрольная сумма), а не голый deflate
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(data, encoding):
+    """Сжимает тело ответа целиком"""
+    compressor = StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_chunks(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        if chunk:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.finish()
+
+
+def coalesce_chunks(chunks, size):
+    """
+    Склеивает мелкие части потока (шаблон выдает строки по нескольку байт) в части
+    не меньше size байт: меньше системных вызовов при отправке и лучше сжатие по частям.
+    """
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def read_head(chunks, size):
+    """
+    Читает начало потока, пока не наберется size байт.
+    Возвращает (прочитанные байты, True, если поток на этом закончился).
+    """
+    head = []
+    read = 0
+    for chunk in chunks:
+        head.append(chunk)
+        read += len(chunk)
+        if read >= size:
+            return b''.join(head), False
+    return b''.join(head), True
@@ -0,0 +1,39 @@
+"""
+Ограниченный пул потоков для медленных функций хеширования паролей (KDF).
+
+scrypt и pbkdf2 из hashlib отпускают GIL, поэтому хеширование в пуле не мешает
+остальным потокам рендерить страницы, а размер пула ограничивает долю CPU,
+которую могут занять одновременные входы и регистрации.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class KdfPoolBusy(Exception):
+    """Очередь пула заполнена или результат не получен за отведенное время"""
+
+
+class KdfPool:
+    def __init__(self, max_workers=2, max_pending=32, timeout=10):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kdf')
+        # Задачи в работе и в очереди; при переполнении новые сразу отклоняются (backpressure)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def run(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise KdfPoolBusy()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise KdfPoolBusy()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
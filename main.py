@@ -1,20 +1,160 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import (Flask, Blueprint, render_template, request, redirect, url_for, flash, session, g,
+                   has_request_context, has_app_context, current_app, jsonify, make_response, abort, stream_with_context,
+                   before_render_template, template_rendered, send_from_directory, stream_template)
+from flask.cli import with_appcontext
+import click
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import event, DDL
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload, deferred, undefer
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from werkzeug.exceptions import HTTPException
+from markupsafe import Markup, escape
 import re
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta, timezone
 import os
-from functools import wraps
-
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-here'
-
-# Конфигурация базы данных
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///news_blog.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Инициализация SQLAlchemy
-db = SQLAlchemy(app)
+import json
+import csv
+import io
+import hashlib
+import itertools
+import logging
+import random
+import threading
+import atexit
+import mimetypes
+from time import perf_counter
+from functools import wraps, partial
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from page_cache import MemoryPageCache, FilePageCache
+from kdf_pool import KdfPool, KdfPoolBusy
+from view_counter import MemoryViewCounter, FileViewCounter, PeriodicFlusher
+from assets import build_assets, load_manifest, choose_encoding, ENCODING_SUFFIXES
+from write_queue import GroupCommitQueue, WriteQueueFull
+from catalog import ArticleCatalog
+from compression import (COMPRESSIBLE_MIMETYPES, available_encodings, compress, compress_chunks,
+                         coalesce_chunks, read_head)
+
+# Инициализация SQLAlchemy (приложение подключается в create_app)
+db = SQLAlchemy()
+
+# Все маршруты сайта
+bp = Blueprint('main', __name__)
+# JSON API только для чтения
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+# Счётчик SQL-запросов за время обработки одного HTTP-запроса.
+# Значение лежит в g.query_count, тесты могут проверять его, чтобы поймать возврат N+1.
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+        if 'metrics' in g:
+            conn.info.setdefault('query_started', []).append(perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def time_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics' in g and conn.info.get('query_started'):
+        g.metrics['sql_time'] += perf_counter() - conn.info['query_started'].pop()
+
+
+# Профиль SQLite по умолчанию: WAL, чтобы читатели не ждали писателей,
+# и busy_timeout, чтобы конкурирующие записи ждали блокировку, а не падали с "database is locked".
+# foreign_keys включает ON DELETE CASCADE: дочерние строки удаляет сама БД
+DEFAULT_SQLITE_PRAGMAS = {
+    'foreign_keys': 'ON',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Подписывает движок на событие connect, чтобы настроить каждое новое соединение"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def get_query_count():
+    """Возвращает число SQL-запросов, выполненных в текущем запросе"""
+    return g.get('query_count', 0)
+
+
+# Метрики запросов: структурированные строки в лог и сводка по маршрутам на /metrics
+# Обработчик журнала подключает create_app, если сбор метрик включен
+metrics_logger = logging.getLogger('meow_blog.metrics')
+
+request_metrics = {}
+request_metrics_lock = threading.Lock()
+
+
+@bp.before_app_request
+def start_request_metrics():
+    # Для невыбранных запросов стоимость - одно сравнение
+    sample_rate = current_app.config['METRICS_SAMPLE_RATE']
+    if sample_rate and random.random() < sample_rate:
+        g.metrics = {'started': perf_counter(), 'sql_time': 0.0, 'render_time': 0.0}
+
+
+@before_render_template.connect
+def start_render_timer(sender, template, context, **extra):
+    if 'metrics' in g:
+        g.metrics['render_started'] = perf_counter()
+
+
+@template_rendered.connect
+def stop_render_timer(sender, template, context, **extra):
+    if 'metrics' in g and 'render_started' in g.metrics:
+        g.metrics['render_time'] += perf_counter() - g.metrics.pop('render_started')
+
+
+@bp.after_app_request
+def record_request_metrics(response):
+    # В режиме отладки и тестирования отдаём счётчик в заголовке ответа
+    if current_app.debug or current_app.testing:
+        response.headers['X-Query-Count'] = str(get_query_count())
+
+    if 'metrics' not in g:
+        return response
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint or 'unknown',
+        'status': response.status_code,
+        'duration_ms': round((perf_counter() - g.metrics['started']) * 1000, 3),
+        'sql_count': get_query_count(),
+        'sql_ms': round(g.metrics['sql_time'] * 1000, 3),
+        'render_ms': round(g.metrics['render_time'] * 1000, 3),
+    }
+    metrics_logger.info(json.dumps(record, ensure_ascii=False))
+
+    with request_metrics_lock:
+        stats = request_metrics.setdefault(record['endpoint'], {
+            'count': 0, 'duration_ms': 0.0, 'max_duration_ms': 0.0,
+            'sql_count': 0, 'sql_ms': 0.0, 'render_ms': 0.0,
+        })
+        stats['count'] += 1
+        stats['duration_ms'] += record['duration_ms']
+        stats['max_duration_ms'] = max(stats['max_duration_ms'], record['duration_ms'])
+        stats['sql_count'] += record['sql_count']
+        stats['sql_ms'] += record['sql_ms']
+        stats['render_ms'] += record['render_ms']
+    return response
 
 
 # Функция для получения текущей даты в правильном часовом поясе
@@ -23,30 +163,104 @@ def get_local_datetime():
     return datetime.now()
 
 
+# Текущее время в UTC без часового пояса (для HTTP-заголовков Last-Modified)
+def get_utc_datetime():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Границы сегодняшнего дня [сегодня 00:00, завтра 00:00) для запросов по дате
+def get_today_bounds():
+    """
+    Возвращает начало сегодняшнего и начало завтрашнего дня.
+    Внутри HTTP-запроса границы вычисляются один раз, чтобы все статьи
+    на странице сравнивались с одним и тем же "сегодня".
+    """
+    if has_request_context() and 'today_bounds' in g:
+        return g.today_bounds
+    today_start = datetime.combine(date.today(), time.min)
+    bounds = today_start, today_start + timedelta(days=1)
+    if has_request_context():
+        g.today_bounds = bounds
+    return bounds
+
+
 # Декоратор для проверки авторизации
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             flash('Пожалуйста, войдите в систему для доступа к этой странице.', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
 
     return decorated_function
 
 
+# Кэш ролей: user_id -> (истекает, является ли администратором).
+# Сбрасывается при изменении роли или удалении пользователя (invalidate_role_cache), иначе - по TTL
+def is_admin_user(user_id):
+    role_cache = current_app.extensions['role_cache']
+    cached = role_cache.get(user_id)
+    if cached and cached[0] > perf_counter():
+        return cached[1]
+    is_admin = bool(db.session.execute(db.select(User.is_admin).where(User.id == user_id)).scalar())
+    role_cache[user_id] = (perf_counter() + current_app.config['ROLE_CACHE_TTL'], is_admin)
+    return is_admin
+
+
+def invalidate_role_cache(user_ids):
+    if has_app_context():
+        role_cache = current_app.extensions.get('role_cache', {})
+        for user_id in user_ids:
+            role_cache.pop(user_id, None)
+
+
+# Хеширование паролей выполняется в ограниченном пуле потоков (см. kdf_pool.py)
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+def get_password_hash_method():
+    if has_app_context():
+        return current_app.config['PASSWORD_HASH_METHOD']
+    return DEFAULT_PASSWORD_HASH_METHOD
+
+
+# Параметры, которые werkzeug подставляет в сокращенную запись метода scrypt
+SCRYPT_DEFAULT_PARAMS = ['32768', '8', '1']
+
+
+def password_hash_prefix(method):
+    """
+    Полная запись параметров хеша для метода из настроек, как ее дополняет werkzeug
+    ('scrypt' -> 'scrypt:32768:8:1', 'pbkdf2:sha256' -> 'pbkdf2:sha256:1000000').
+    Разбирается как строка: хеширование в потоке запроса заняло бы его так же, как вход.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = SCRYPT_DEFAULT_PARAMS
+    elif name == 'pbkdf2' and len(args) < 2:
+        args = [args[0] if args else 'sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    return ':'.join([name, *args])
+
+
+def run_kdf(func, *args, **kwargs):
+    pool = current_app.extensions.get('kdf_pool') if has_app_context() else None
+    if pool is None:
+        return func(*args, **kwargs)
+    return pool.run(func, *args, **kwargs)
+
+
 # Декоратор для проверки администратора
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             flash('Пожалуйста, войдите в систему для доступа к этой странице.', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
 
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_admin:
+        if not is_admin_user(session['user_id']):
             flash('У вас нет прав для доступа к этой странице.', 'error')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
 
         return f(*args, **kwargs)
 
@@ -65,41 +279,135 @@ class User(db.Model):
     is_admin = db.Column(db.Boolean, default=False)
 
     # Связь "один ко многим" с Article
-    articles = db.relationship('Article', backref='author', lazy=True, cascade='all, delete-orphan')
+    # Статьи удаляет сама БД (ON DELETE CASCADE), без загрузки в память
+    articles = db.relationship('Article', backref='author', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
     # Связь "один ко многим" с Comment
-    comments = db.relationship('Comment', backref='user', lazy=True)
+    comments = db.relationship('Comment', backref='user', lazy=True, passive_deletes=True)
 
     def set_password(self, password):
-        self.hashed_password = generate_password_hash(password)
+        self.hashed_password = run_kdf(generate_password_hash, password, method=get_password_hash_method())
 
     def check_password(self, password):
-        return check_password_hash(self.hashed_password, password)
+        return run_kdf(check_password_hash, self.hashed_password, password)
+
+    def password_needs_rehash(self):
+        # Хеш начинается с параметров алгоритма: 'scrypt:32768:8:1$соль$хеш'
+        return self.hashed_password.split('$', 1)[0] != password_hash_prefix(get_password_hash_method())
 
     def __repr__(self):
         return f'<User {self.name}>'
 
 
+# Модель Category: справочник категорий. Число статей и статей за сегодня поддерживаются
+# при записи статей (см. track_data_changes), поэтому блок категорий не делает GROUP BY
+class Category(db.Model):
+    __tablename__ = 'categories'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    # Часть адреса /category/<slug>
+    slug = db.Column(db.String(50), unique=True, nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    article_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Статьи за день today_date; если этот день прошел, статей за сегодня нет
+    today_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    today_date = db.Column(db.Date)
+
+    def __repr__(self):
+        return f'<Category {self.slug}>'
+
+
 # Модель Article
 class Article(db.Model):
     __tablename__ = 'articles'
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    text = db.Column(db.Text, nullable=False)
-    created_date = db.Column(db.DateTime, default=get_local_datetime)
-    category = db.Column(db.String(50), nullable=False, default='Разное')
+    # Исходный текст и готовый HTML загружаются только по требованию, списки статей их не читают
+    text = deferred(db.Column(db.Text, nullable=False))
+    html = deferred(db.Column(db.Text))
+    created_date = db.Column(db.DateTime, default=get_local_datetime, index=True)
+    # Индекс по category_id - составной индекс ниже
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     excerpt = db.Column(db.Text)
+    # Анонс написан автором; иначе он вычисляется из текста и обновляется вместе с ним
+    excerpt_manual = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    word_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Число комментариев, поддерживается при добавлении и удалении комментариев (см. track_data_changes)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Число просмотров, записывается пачками фоновой выгрузкой (см. flush_views)
+    views = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Внешний ключ для связи с User
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
-    # Связь "один ко многим" с Comment
-    comments = db.relationship('Comment', backref='article', lazy=True, cascade='all, delete-orphan')
+    # Связь "один ко многим" с Comment; комментарии удаляет сама БД (ON DELETE CASCADE)
+    comments = db.relationship('Comment', backref='article', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
+    # Категория загружается тем же запросом: JOIN с маленькой таблицей по первичному ключу
+    category = db.relationship('Category', lazy='joined', innerjoin=True)
+
+    # Составной индекс для страниц категорий (id неявно входит в индекс как rowid)
+    __table_args__ = (
+        db.Index('ix_articles_category_created_date', 'category_id', 'created_date'),
+    )
 
     def __repr__(self):
         return f'<Article {self.title}>'
 
 
+# HTML, анонс и число слов статьи вычисляются один раз при записи, а не при каждом показе
+ARTICLE_EXCERPT_LENGTH = 100
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def render_article_html(text):
+    """
+    Превращает текст статьи в HTML: пустая строка разделяет абзацы <p>,
+    перевод строки внутри абзаца - <br>. Весь текст экранируется, разметка из текста не проходит.
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n').strip()
+    paragraphs = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        lines = [str(escape(line.strip())) for line in paragraph.split('\n') if line.strip()]
+        if lines:
+            paragraphs.append('<p>' + '<br>'.join(lines) + '</p>')
+    return '\n'.join(paragraphs)
+
+
+def make_excerpt(text, length=ARTICLE_EXCERPT_LENGTH):
+    """Анонс из начала текста: не длиннее length символов, обрезается по границе слова"""
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1].rsplit(' ', 1)[0] if ' ' in text[:length + 1] else text[:length]
+    return cut[:length].rstrip('.,;:!?-— ') + '...'
+
+
+def article_derived_fields(text, excerpt=None):
+    """Поля, вычисляемые из текста статьи; используются и ORM-событиями, и пакетной вставкой"""
+    return {
+        'html': render_article_html(text),
+        'excerpt': excerpt or make_excerpt(text),
+        'excerpt_manual': bool(excerpt),
+        'word_count': len(re.findall(r'\w+', text)),
+    }
+
+
+@event.listens_for(Article, 'before_insert')
+@event.listens_for(Article, 'before_update')
+def fill_article_derived_fields(mapper, connection, article):
+    state = db.inspect(article)
+    # Анонс, заданный при записи, - авторский; пустой - вычисляется из текста
+    if state.pending or state.attrs.excerpt.history.has_changes():
+        article.excerpt_manual = bool(article.excerpt)
+    if state.pending or state.attrs.text.history.has_changes() or not article.excerpt:
+        excerpt = article.excerpt if article.excerpt_manual else None
+        for name, value in article_derived_fields(article.text, excerpt).items():
+            setattr(article, name, value)
+
+
 # Модель Comment
 class Comment(db.Model):
     __tablename__ = 'comments'
@@ -110,24 +418,464 @@ class Comment(db.Model):
     author_name = db.Column(db.String(100), nullable=False)
 
     # Внешний ключ для связи с Article
-    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), nullable=False)
     # Внешний ключ для связи с User (если комментарий от зарегистрированного пользователя)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+
+    # Индекс для постраничного вывода комментариев статьи по дате
+    __table_args__ = (
+        db.Index('ix_comments_article_id_date', 'article_id', 'date'),
+    )
 
     def __repr__(self):
         return f'<Comment {self.id} by {self.author_name}>'
 
 
-# Создание таблиц при запуске
-with app.app_context():
-    # Пересоздаем все таблицы
-    try:
-        db.drop_all()
-        db.create_all()
-        print("✅ Таблицы успешно созданы")
-    except Exception as e:
-        print(f"❌ Ошибка при создании таблиц: {e}")
+# Модель ChangeCounter: версия и время последнего изменения данных по тегу
+# ('articles', 'category:<slug>', 'categories', 'article:<id>', 'comments:<id>', 'feed', 'feed:<slug>')
+# для ETag и Last-Modified
+class ChangeCounter(db.Model):
+    __tablename__ = 'change_counters'
+
+    tag = db.Column(db.String(200), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Индекс нужен каталогу статей: он дочитывает теги, измененные после его последней синхронизации
+    changed_at = db.Column(db.DateTime, nullable=False, default=get_utc_datetime, index=True)
+
+    def __repr__(self):
+        return f'<ChangeCounter {self.tag}={self.version}>'
+
+
+# Модель ArticleViewDay: просмотры статьи за день, из них складывается рейтинг популярных за неделю
+class ArticleViewDay(db.Model):
+    __tablename__ = 'article_view_days'
+
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ArticleViewDay {self.article_id} {self.day}={self.views}>'
+
+
+# Полнотекстовый поиск: виртуальные таблицы FTS5 статей (rowid = id статьи) и комментариев
+# (rowid = id комментария). Комментарии индексируются каждый своей строкой, поэтому запись
+# комментария не переписывает строку статьи; к статьям они сводятся при поиске.
+# Индекс поддерживается триггерами, поэтому обновляется при любой записи в articles и comments.
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+       USING fts5(title, excerpt, text, tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts
+       USING fts5(text, article_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+           INSERT INTO articles_fts(rowid, title, excerpt, text)
+           VALUES (new.id, new.title, coalesce(new.excerpt, ''), new.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, excerpt, text ON articles BEGIN
+           UPDATE articles_fts SET title = new.title, excerpt = coalesce(new.excerpt, ''), text = new.text
+           WHERE rowid = new.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+           DELETE FROM articles_fts WHERE rowid = old.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments BEGIN
+           INSERT INTO comments_fts(rowid, text, article_id) VALUES (new.id, new.text, new.article_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_update AFTER UPDATE OF text, article_id ON comments BEGIN
+           UPDATE comments_fts SET text = new.text, article_id = new.article_id WHERE rowid = new.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments BEGIN
+           DELETE FROM comments_fts WHERE rowid = old.id;
+       END""",
+]
+SEARCH_TABLES = ['articles_fts', 'comments_fts']
+SEARCH_TRIGGERS = ['articles_fts_insert', 'articles_fts_update', 'articles_fts_delete',
+                   'comments_fts_insert', 'comments_fts_update', 'comments_fts_delete']
+
+for statement in SEARCH_DDL:
+    event.listen(Comment.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for table in SEARCH_TABLES:
+    event.listen(Article.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {table}').execute_if(dialect='sqlite'))
+
+# Веса столбцов для bm25: title, excerpt, text; совпадение в комментарии весит как в тексте с этим множителем
+SEARCH_WEIGHTS = '10.0, 5.0, 1.0'
+SEARCH_COMMENT_WEIGHT = 0.5
+# Маркеры совпадений в сниппете; заменяются на <mark> после экранирования текста
+SNIPPET_START, SNIPPET_END = '\x02', '\x03'
+
+
+def rebuild_search_index():
+    """
+    Пересоздает поисковый индекс и заново заполняет его по текущим данным.
+    Таблицы и триггеры пересоздаются, поэтому команда переводит и базу со старой схемой индекса.
+    """
+    for trigger in SEARCH_TRIGGERS:
+        db.session.execute(db.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+    for table in SEARCH_TABLES:
+        db.session.execute(db.text(f'DROP TABLE IF EXISTS {table}'))
+    for statement in SEARCH_DDL:
+        db.session.execute(db.text(statement))
+    db.session.execute(db.text("""
+        INSERT INTO articles_fts(rowid, title, excerpt, text)
+        SELECT id, title, coalesce(excerpt, ''), text FROM articles
+    """))
+    db.session.execute(db.text("""
+        INSERT INTO comments_fts(rowid, text, article_id) SELECT id, text, article_id FROM comments
+    """))
+    db.session.commit()
+
+
+def build_match_query(query):
+    """
+    Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово берется в кавычки, последнее ищется как префикс.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
 
+
+def render_snippet(snippet):
+    return Markup(str(escape(snippet))
+                  .replace(SNIPPET_START, '<mark>')
+                  .replace(SNIPPET_END, '</mark>'))
+
+
+def search_articles(query, page=1, per_page=None, include_comments=True):
+    """
+    Ищет статьи по заголовку, анонсу, тексту и (по желанию) комментариям.
+    Результаты ранжируются по bm25. Возвращает словарь с результатами страницы
+    и признаком наличия следующей страницы.
+    """
+    per_page = per_page or current_app.config['ARTICLES_PER_PAGE']
+    match = build_match_query(query)
+    if not match:
+        return {'results': [], 'has_next': False}
+
+    if db.engine.dialect.name == 'sqlite':
+        # Статья находится по своему тексту или по лучшему из своих комментариев; ранг - сумма bm25
+        # (чем меньше, тем лучше). MATERIALIZED: функции FTS5 нельзя вызывать внутри агрегатного запроса
+        params = {'match': match, 'start': SNIPPET_START, 'end': SNIPPET_END}
+        # Неиспользуемое табличное выражение comment_hits SQLite не вычисляет
+        comment_hits = f"""
+            UNION ALL
+            -- comment_id берется из строки с минимальным bm25 - лучшего комментария статьи
+            SELECT article_id, min(rank) * {SEARCH_COMMENT_WEIGHT}, 0, comment_id
+            FROM comment_hits GROUP BY article_id
+        """ if include_comments else ''
+        rows = db.session.execute(db.text(f"""
+            WITH article_hits AS MATERIALIZED (
+                SELECT rowid AS id, bm25(articles_fts, {SEARCH_WEIGHTS}) AS rank
+                FROM articles_fts WHERE articles_fts MATCH :match
+            ), comment_hits AS MATERIALIZED (
+                SELECT article_id, bm25(comments_fts) AS rank, rowid AS comment_id
+                FROM comments_fts WHERE comments_fts MATCH :match
+            )
+            SELECT id, sum(rank) AS rank, max(in_article) AS in_article, max(comment_id) AS comment_id FROM (
+                SELECT id, rank, 1 AS in_article, NULL AS comment_id FROM article_hits
+                {comment_hits}
+            )
+            GROUP BY id
+            ORDER BY rank, id
+            LIMIT :limit OFFSET :offset
+        """), {**params, 'limit': per_page + 1, 'offset': (page - 1) * per_page}).all()
+        # Сниппеты - только для статей страницы: из статьи, а если она найдена по комментариям - из комментария
+        article_ids = [row.id for row in rows[:per_page] if row.in_article]
+        comment_ids = [row.comment_id for row in rows[:per_page] if not row.in_article]
+        snippets = {}
+        if rows:
+            snippets = {article_id: render_snippet(snippet) for article_id, snippet in db.session.execute(
+                db.text("""
+                    SELECT rowid, snippet(articles_fts, -1, :start, :end, '…', 16)
+                    FROM articles_fts WHERE articles_fts MATCH :match AND rowid IN :article_ids
+                    UNION ALL
+                    SELECT article_id, snippet(comments_fts, 0, :start, :end, '…', 16)
+                    FROM comments_fts WHERE comments_fts MATCH :match AND rowid IN :comment_ids
+                """).bindparams(db.bindparam('article_ids', expanding=True),
+                                db.bindparam('comment_ids', expanding=True)),
+                {**params, 'article_ids': article_ids, 'comment_ids': comment_ids})}
+        ids = [row.id for row in rows]
+    else:
+        # Для СУБД без FTS5 - простой поиск по подстроке
+        pattern = f'%{query.strip()}%'
+        ids = [row.id for row in db.session.execute(
+            db.select(Article.id)
+            .where(db.or_(Article.title.ilike(pattern), Article.excerpt.ilike(pattern), Article.text.ilike(pattern)))
+            .order_by(Article.created_date.desc())
+            .limit(per_page + 1).offset((page - 1) * per_page)
+        )]
+        snippets = {}
+
+    articles = {article.id: article for article in
+                Article.query.options(joinedload(Article.author)).filter(Article.id.in_(ids[:per_page]))}
+    results = []
+    for article_id in ids[:per_page]:
+        if article_id in articles:
+            result = article_to_dict(articles[article_id])
+            result['snippet'] = snippets.get(article_id) or result['excerpt']
+            results.append(result)
+    return {'results': results, 'has_next': len(ids) > per_page}
+
+
+# Категории, которые создает flask init-db: название и slug для адреса /category/<slug>
+DEFAULT_CATEGORIES = [
+    ('Искусство', 'iskusstvo'),
+    ('Мода', 'moda'),
+    ('Разное', 'raznoe'),
+    ('Политика', 'politika'),
+]
+
+
+# Создание таблиц базы данных (flask init-db)
+def init_db(drop=False):
+    if drop:
+        db.drop_all()
+    db.create_all()
+    existing = set(db.session.execute(db.select(Category.slug)).scalars())
+    for position, (name, slug) in enumerate(DEFAULT_CATEGORIES):
+        if slug not in existing:
+            db.session.add(Category(name=name, slug=slug, position=position))
+    db.session.commit()
+
+
+# Перевод существующей базы на текущую схему (flask migrate-db): таблицы, столбцы, индексы
+# и внешние ключи, которых в ней нет, добавляются без потери данных. Повторный запуск ничего не меняет
+OBSOLETE_COLUMNS = {'articles': ['category']}
+MIGRATE_BATCH_SIZE = 1000
+SLUG_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z', 'и': 'i',
+    'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't',
+    'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+
+def make_category_slug(name, taken):
+    """slug из названия категории транслитерацией ('Разное' -> 'raznoe'), уникальный среди taken"""
+    base = re.sub(r'[^a-z0-9]+', '-', name.lower().translate(SLUG_TRANSLIT)).strip('-') or 'category'
+    slug, suffix = base, 2
+    while slug in taken:
+        slug, suffix = f'{base}-{suffix}', suffix + 1
+    taken.add(slug)
+    return slug
+
+
+def schema_mismatches(connection, table):
+    """Отличия таблицы в базе от модели, которые не исправить ALTER TABLE ADD/DROP COLUMN в SQLite"""
+    inspector = db.inspect(connection)
+    mismatches = []
+    model_keys = {(tuple(fk.column_keys), fk.referred_table.name, (fk.ondelete or '').upper())
+                  for fk in table.foreign_key_constraints}
+    db_keys = {(tuple(fk['constrained_columns']), fk['referred_table'], (fk['options'].get('ondelete') or '').upper())
+               for fk in inspector.get_foreign_keys(table.name)}
+    if model_keys != db_keys:
+        mismatches.append('внешние ключи')
+    nullable = {column['name']: column['nullable'] for column in inspector.get_columns(table.name)}
+    mismatches += [f'NOT NULL {column.name}' for column in table.columns
+                   if not column.nullable and not column.primary_key and nullable.get(column.name)]
+    return mismatches
+
+
+def add_missing_columns(connection, table, steps):
+    """ALTER TABLE ADD COLUMN для столбцов модели, которых нет в таблице; возвращает их имена"""
+    existing = {column['name'] for column in db.inspect(connection).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        # Внешний ключ и NOT NULL без значения по умолчанию добавляются после заполнения столбца
+        # (см. rebuild_sqlite_table и enforce_constraints)
+        spec = db.Column(column.name, column.type, server_default=column.server_default.arg
+                         if column.server_default is not None else None,
+                         nullable=column.nullable or column.server_default is None)
+        db.Table(table.name, db.MetaData(), spec)
+        ddl = db.schema.CreateColumn(spec).compile(dialect=connection.dialect)
+        connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+        added.append(column.name)
+        steps.append(f'Добавлен столбец {table.name}.{column.name}')
+    return added
+
+
+def migrate_categories(connection, steps):
+    """Категории из названий в articles.category: справочник и articles.category_id"""
+    names = connection.execute(db.text('SELECT DISTINCT category FROM articles WHERE category_id IS NULL')).scalars()
+    registry = {row.name: row.id for row in connection.execute(db.select(Category.id, Category.name))}
+    taken = set(connection.execute(db.select(Category.slug)).scalars())
+    position = connection.execute(db.select(db.func.coalesce(db.func.max(Category.position), -1))).scalar()
+    for name in names:
+        name = (name or '').strip() or 'Разное'
+        if name not in registry:
+            position += 1
+            registry[name] = connection.execute(Category.__table__.insert().values(
+                name=name, slug=make_category_slug(name, taken), position=position)).inserted_primary_key[0]
+            steps.append(f'Создана категория {name}')
+    connection.execute(db.text("""
+        UPDATE articles SET category_id = (
+            SELECT id FROM categories WHERE categories.name = coalesce(nullif(trim(articles.category), ''), 'Разное'))
+        WHERE category_id IS NULL
+    """))
+    steps.append('Заполнен articles.category_id')
+
+
+def drop_obsolete_columns(connection, table, steps):
+    inspector = db.inspect(connection)
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    for name in OBSOLETE_COLUMNS.get(table.name, []):
+        if name not in existing:
+            continue
+        # Столбец из индекса удалить нельзя; индексы модели пересоздаются в sync_indexes
+        for index in inspector.get_indexes(table.name):
+            if name in index['column_names']:
+                connection.execute(db.text(f'DROP INDEX {index["name"]}'))
+        connection.execute(db.text(f'ALTER TABLE {table.name} DROP COLUMN {name}'))
+        steps.append(f'Удален столбец {table.name}.{name}')
+
+
+def rebuild_sqlite_table(connection, table):
+    """
+    Внешние ключи и NOT NULL в SQLite меняются только пересозданием таблицы: новая таблица
+    по модели, копирование строк, удаление старой и переименование новой (порядок из документации
+    SQLite). Нужен PRAGMA foreign_keys=OFF, иначе удаление старой таблицы сработает как каскад.
+    """
+    metadata = db.MetaData()
+    for model_table in db.metadata.sorted_tables:
+        model_table.to_metadata(metadata)
+    new_table = metadata.tables[table.name].to_metadata(metadata, name=f'{table.name}_new')
+    # Индексы переносятся в sync_indexes: их имена заняты индексами старой таблицы
+    new_table.indexes.clear()
+    connection.execute(db.schema.CreateTable(new_table))
+    columns = ', '.join(column.name for column in table.columns)
+    connection.execute(db.text(f'INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}'))
+    connection.execute(db.text(f'DROP TABLE {table.name}'))
+    connection.execute(db.text(f'ALTER TABLE {new_table.name} RENAME TO {table.name}'))
+
+
+def enforce_constraints(connection, table, steps):
+    mismatches = schema_mismatches(connection, table)
+    if not mismatches:
+        return
+    if connection.dialect.name == 'sqlite':
+        rebuild_sqlite_table(connection, table)
+    else:
+        for fk in db.inspect(connection).get_foreign_keys(table.name):
+            connection.execute(db.text(f'ALTER TABLE {table.name} DROP CONSTRAINT {fk["name"]}'))
+        for constraint in table.foreign_key_constraints:
+            connection.execute(db.schema.AddConstraint(constraint))
+        for column in table.columns:
+            if not column.nullable and not column.primary_key:
+                connection.execute(db.text(f'ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL'))
+    steps.append(f'Таблица {table.name}: {", ".join(mismatches)}')
+
+
+def sync_indexes(connection, table, steps):
+    """Создает индексы модели, которых нет в базе; индекс с тем же именем по другим столбцам пересоздается"""
+    existing = {index['name']: index['column_names'] for index in db.inspect(connection).get_indexes(table.name)}
+    for index in table.indexes:
+        columns = [column.name for column in index.columns]
+        if existing.get(index.name) == columns:
+            continue
+        if index.name in existing:
+            connection.execute(db.text(f'DROP INDEX {index.name}'))
+        index.create(connection)
+        steps.append(f'Создан индекс {index.name}')
+
+
+def fill_article_derived_columns(connection, added, steps):
+    """HTML, число слов и признак авторского анонса для статей, сохраненных до появления этих столбцов"""
+    articles = Article.__table__
+    if 'comment_count' in added:
+        connection.execute(articles.update().values(comment_count=db.select(db.func.count()).where(
+            Comment.__table__.c.article_id == articles.c.id).scalar_subquery()))
+        steps.append('Пересчитано число комментариев статей')
+    if not {'html', 'word_count', 'excerpt_manual'} & set(added):
+        return
+    # Анонс, совпадающий с вычисленным из текста, считается вычисленным и дальше следует за текстом
+    guess_manual = 'excerpt_manual' in added
+    query = (db.select(articles.c.id, articles.c.text, articles.c.excerpt, articles.c.excerpt_manual)
+             .order_by(articles.c.id).limit(MIGRATE_BATCH_SIZE))
+    if not guess_manual:
+        query = query.where(articles.c.html.is_(None))
+    last_id = 0
+    total = 0
+    while True:
+        rows = connection.execute(query.where(articles.c.id > last_id)).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            manual = bool(row.excerpt) and row.excerpt != make_excerpt(row.text) if guess_manual else row.excerpt_manual
+            updates.append({'row_id': row.id, **article_derived_fields(row.text, row.excerpt if manual else None)})
+        connection.execute(articles.update().where(articles.c.id == db.bindparam('row_id')), updates)
+        last_id = rows[-1].id
+        total += len(rows)
+    steps.append(f'Заполнены HTML, анонсы и число слов: {total} статей')
+
+
+def migrate_db():
+    """
+    Переводит существующую базу (в том числе созданную до фабрики приложения) на текущую схему:
+    создает недостающие таблицы, добавляет столбцы (ALTER TABLE) и заполняет их по имеющимся данным,
+    переносит категории из строкового столбца в справочник, приводит внешние ключи и индексы
+    к моделям и пересобирает поисковый индекс. Возвращает список выполненных шагов.
+    """
+    steps = []
+    existing_tables = set(db.inspect(db.engine).get_table_names())
+    missing = [table for table in db.metadata.sorted_tables if table.name not in existing_tables]
+    if missing:
+        db.metadata.create_all(db.engine, tables=missing)
+        steps += [f'Создана таблица {table.name}' for table in missing]
+    init_db()
+
+    sqlite = db.engine.dialect.name == 'sqlite'
+    with db.engine.connect() as connection:
+        if sqlite:
+            # Вне транзакции: внутри нее PRAGMA foreign_keys не действует
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+        try:
+            with connection.begin():
+                if sqlite:
+                    # Триггеры поиска ссылаются на пересоздаваемые таблицы; rebuild_search_index создаст их заново
+                    for trigger in SEARCH_TRIGGERS:
+                        connection.execute(db.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+                added = {}
+                for table in db.metadata.sorted_tables:
+                    if table not in missing:
+                        added[table.name] = add_missing_columns(connection, table, steps)
+                if 'category_id' in added.get('articles', []):
+                    migrate_categories(connection, steps)
+                fill_article_derived_columns(connection, added.get('articles', []), steps)
+                for table in db.metadata.sorted_tables:
+                    if table not in missing:
+                        drop_obsolete_columns(connection, table, steps)
+                        enforce_constraints(connection, table, steps)
+                    sync_indexes(connection, table, steps)
+                if sqlite:
+                    problems = connection.exec_driver_sql('PRAGMA foreign_key_check').all()
+                    if problems:
+                        raise ValueError(f'Строки с несуществующими внешними ключами: {problems[:10]}')
+        finally:
+            if sqlite:
+                connection.rollback()
+                connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                connection.commit()
+
+    if sqlite:
+        rebuild_search_index()
+    if steps:
+        recount_categories()
+        # Страницы в кэше отрендерены по старым данным
+        cache = get_page_cache()
+        if cache is not None:
+            cache.clear()
+    return steps
+
+
+# Заполнение базы демонстрационными данными (flask seed-demo)
+def seed_demo_data():
     # Создаем тестовых пользователей, если их нет
     if not User.query.first():
         print("🔄 Создаем тестовых пользователей...")
@@ -159,25 +907,26 @@ with app.app_context():
         users = User.query.all()
         if users and not Article.query.first():
             print("🔄 Создаем тестовые статьи...")
+            categories = {category.name: category.id for category in Category.query}
             # Статьи с СЕГОДНЯШНЕЙ датой (используем локальное время)
             article1 = Article(
                 title='Новая картина Бэнкси',
                 text='Может завтра нарисует?',
-                category='Искусство',
+                category_id=categories['Искусство'],
                 excerpt='пока не нарисована...',
                 user_id=users[0].id
             )
             article2 = Article(
                 title='Я новость',
                 text='Да блин нуууу :(((',
-                category='Разное',
+                category_id=categories['Разное'],
                 excerpt='не открывай меня',
                 user_id=users[1].id if len(users) > 1 else users[0].id
             )
             article3 = Article(
                 title='Новый показ Victoria`s Secret',
                 text='Красотки, умницы, молодцы! Так держать девчонки!',
-                category='Мода',
+                category_id=categories['Мода'],
                 excerpt='Возвращение легендарных ангелов на подиум',
                 user_id=users[2].id if len(users) > 2 else users[0].id
             )
@@ -186,7 +935,7 @@ with app.app_context():
             article4 = Article(
                 title='Старая статья',
                 text='Это старая статья для тестирования',
-                category='Разное',
+                category_id=categories['Разное'],
                 excerpt='старая статья...',
                 user_id=users[0].id,
                 created_date=yesterday
@@ -228,27 +977,661 @@ with app.app_context():
                 db.session.rollback()
                 print(f"❌ Ошибка при создании статей/комментариев: {e}")
 
-# Обновленные категории
-CATEGORIES = [
-    'Искусство',
-    'Мода',
-    'Разное',
-    'Политика'
-]
+# Кэш отрендеренных публичных страниц
+def get_page_cache():
+    return current_app.extensions.get('page_cache')
+
+
+def get_change_validators(tags):
+    """
+    Читает счётчики изменений тегов одним запросом по первичному ключу.
+    Возвращает словарь версий и время последнего изменения (UTC) или None.
+    """
+    rows = db.session.execute(
+        db.select(ChangeCounter.tag, ChangeCounter.version, ChangeCounter.changed_at)
+        .where(ChangeCounter.tag.in_(tags))
+    ).all()
+    versions = {row.tag: row.version for row in rows}
+    last_modified = max((row.changed_at for row in rows), default=None)
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return versions, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    # Сравнение слабое (RFC 9110): сжатый ответ отдается со слабым ETag той же страницы
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    # Дата изменения не учитывает вход пользователя, поэтому для вошедших проверяется только ETag
+    if request.if_modified_since and last_modified and 'user_id' not in session:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Клиент и прокси должны перепроверять страницу, страницы вошедших пользователей - только у клиента
+    response.cache_control.no_cache = True
+    if 'user_id' in session:
+        response.cache_control.private = True
+    return response
+
+
+def cached_page(tags, daily=True, negotiate_format=False, popular=False):
+    """
+    Отдает публичную GET-страницу с учетом кэшей.
+    tags - функция от аргументов маршрута, возвращающая теги данных, от которых зависит страница.
+    daily=False - страница не зависит от текущей даты (нет отметок "Новое!"), например ленты Atom.
+    negotiate_format=True - формат ответа зависит от заголовка Accept (JSON или JSON Lines, см. wants_jsonl):
+    формат входит в ключ и ETag, ответы отдаются с Vary: Accept.
+    popular=True - на странице есть блок популярных статей: в ключ входит поколение рейтинга
+    (см. get_popular_generation), и страница обновляется раз в POPULAR_CACHE_TTL секунд,
+    а не при каждой выгрузке просмотров.
+    Ключ страницы учитывает путь с параметрами (страницу), дату, пользователя и версии тегов:
+    при совпадении ETag или If-Modified-Since отдается 304 без рендеринга,
+    иначе страница берется из кэша отрендеренных страниц или рендерится и кладется в него.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Страницы с ожидающими flash-сообщениями всегда рендерятся заново
+            if request.method != 'GET' or '_flashes' in session:
+                return f(*args, **kwargs)
+
+            page_tags = tags(**kwargs)
+            versions, last_modified = get_change_validators(page_tags)
+            # Версии доступны и самому маршруту, например для справочника категорий;
+            # у тегов, которые еще не менялись, версия 0
+            g.change_versions = {tag: versions.get(tag, 0) for tag in page_tags}
+            if daily:
+                # Отметки "Новое!" меняются в полночь даже без изменения данных
+                today_start = get_today_bounds()[0].astimezone(timezone.utc)
+                last_modified = max(last_modified, today_start) if last_modified else today_start
+            key_parts = [request.full_path, date.today().isoformat() if daily else '',
+                         str(session.get('user_id', '')), str(bool(session.get('is_admin')))]
+            key_parts += [f'{tag}={versions.get(tag, 0)}' for tag in page_tags]
+            if popular:
+                generation, generation_start = get_popular_generation()
+                last_modified = max(last_modified, generation_start) if last_modified else generation_start
+                key_parts.append(f'popular={generation}')
+            if negotiate_format:
+                key_parts.append('jsonl' if wants_jsonl() else 'json')
+            key = '|'.join(key_parts)
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+            def finish(response):
+                if negotiate_format:
+                    response.vary.add('Accept')
+                return set_validators(response, etag, last_modified)
+
+            if is_not_modified(etag, last_modified):
+                return finish(current_app.response_class(status=304))
+
+            cache = get_page_cache()
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                response = current_app.response_class(cached['body'], mimetype=cached['mimetype'])
+                response.headers['X-Page-Cache'] = 'HIT'
+                return finish(response)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                if negotiate_format:
+                    response.vary.add('Accept')
+                return response
+            # Потоковый ответ в кэш не попадает: его тело еще не отрендерено
+            if cache is not None and not response.is_streamed:
+                body = response.get_data()
+                cache.set(key, {'body': body, 'mimetype': response.mimetype}, len(body))
+                response.headers['X-Page-Cache'] = 'MISS'
+            return finish(response)
+
+        return decorated_function
+
+    return decorator
+
+
+# Сколько тегов обновлять одним запросом (ограничение на число параметров в SQL)
+CHANGE_COUNTER_CHUNK = 500
+
+
+def feed_tags(slugs):
+    """
+    Теги лент Atom: общей и лент категорий. В отличие от 'articles' и 'category:<slug>',
+    не сбрасываются комментариями, поэтому ленты пересобираются только при изменении статей.
+    """
+    tags = {'feed'}
+    tags.update(f'feed:{slug}' for slug in slugs)
+    return tags
+
+
+def article_cache_tags(article):
+    """Теги страниц, которые нужно сбросить при изменении статьи; теги категорий - category_cache_tags"""
+    return {'articles', f'article:{article.id}', f'comments:{article.id}'}
+
+
+def category_cache_tags(connection, category_ids):
+    """Теги страниц и лент категорий по их id (одним запросом)"""
+    categories = Category.__table__
+    slugs = list(connection.execute(db.select(categories.c.slug).where(categories.c.id.in_(category_ids))).scalars())
+    tags = {f'category:{slug}' for slug in slugs}
+    tags.update(feed_tags(slugs))
+    return tags
+
+
+def add_category_delta(deltas, category_id, sign, created_date, today_bounds):
+    """Учитывает статью в изменениях счетчиков {id категории: [статей, статей за сегодня]}"""
+    today_start, tomorrow_start = today_bounds
+    counts = deltas.setdefault(category_id, [0, 0])
+    counts[0] += sign
+    # Дата не задана при вставке в обход ORM - ее заполнит значение по умолчанию, текущее время
+    if created_date is None or today_start <= created_date < tomorrow_start:
+        counts[1] += sign
+
+
+def apply_category_deltas(connection, deltas):
+    """
+    Обновляет article_count и today_count категорий одним UPDATE на категорию и возвращает
+    теги для сброса. Счетчик за сегодня начинается заново, если today_date - прошедший день.
+    """
+    categories = Category.__table__
+    today = get_local_datetime().date()
+    for category_id, (total, today_delta) in deltas.items():
+        if total or today_delta:
+            connection.execute(categories.update()
+                               .where(categories.c.id == category_id)
+                               .values(article_count=categories.c.article_count + total,
+                                       today_count=db.case((categories.c.today_date == today,
+                                                            categories.c.today_count + today_delta),
+                                                           else_=max(today_delta, 0)),
+                                       today_date=today))
+    return {'categories'}
+
+
+def recount_categories():
+    """Пересчитывает счетчики всех категорий по таблице статей (flask categories-recount)"""
+    categories = Category.__table__
+    articles = Article.__table__
+    today_start, tomorrow_start = get_today_bounds()
+    in_category = articles.c.category_id == categories.c.id
+    connection = db.session.connection()
+    connection.execute(categories.update().values(
+        article_count=db.select(db.func.count()).where(in_category).scalar_subquery(),
+        today_count=db.select(db.func.count()).where(in_category, articles.c.created_date >= today_start,
+                                                     articles.c.created_date < tomorrow_start).scalar_subquery(),
+        today_date=today_start.date(),
+    ))
+    bump_change_counters(connection, ['categories'])
+    db.session.commit()
+
+
+def bump_change_counters(connection, tags):
+    """Увеличивает счетчики изменений тегов в текущей транзакции (по пачкам, а не по одному тегу)"""
+    counters = ChangeCounter.__table__
+    now = get_utc_datetime()
+    tags = sorted(tags)
+    for start in range(0, len(tags), CHANGE_COUNTER_CHUNK):
+        chunk = tags[start:start + CHANGE_COUNTER_CHUNK]
+        existing = set(connection.execute(db.select(counters.c.tag).where(counters.c.tag.in_(chunk))).scalars())
+        if existing:
+            connection.execute(counters.update()
+                               .where(counters.c.tag.in_(existing))
+                               .values(version=counters.c.version + 1, changed_at=now))
+        missing = [tag for tag in chunk if tag not in existing]
+        if missing:
+            connection.execute(counters.insert(), [{'tag': tag, 'version': 1, 'changed_at': now} for tag in missing])
+
+
+def update_comment_counts(connection, deltas):
+    """Применяет изменения числа комментариев {id статьи: прирост} одним UPDATE на статью"""
+    articles = Article.__table__
+    for article_id, delta in deltas.items():
+        if delta:
+            connection.execute(articles.update()
+                               .where(articles.c.id == article_id)
+                               .values(comment_count=articles.c.comment_count + delta))
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_role_changes(session):
+    invalidate_role_cache(session.info.pop('role_changes', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_role_changes(session):
+    session.info.pop('role_changes', None)
+
+
+def apply_comment_deltas(connection, deltas):
+    """
+    Обновляет comment_count статей и возвращает теги страниц, которые нужно сбросить.
+    Число комментариев выводится и в списках статей, поэтому сбрасываются и они.
+    """
+    update_comment_counts(connection, deltas)
+    slugs = connection.execute(db.select(Category.slug)
+                               .join(Article, Article.category_id == Category.id)
+                               .where(Article.id.in_(deltas))
+                               .distinct()).scalars()
+    tags = {'articles'}
+    tags.update(f'category:{slug}' for slug in slugs)
+    tags.update(f'comments:{article_id}' for article_id in deltas)
+    return tags
+
+
+@event.listens_for(Session, 'after_flush')
+def track_data_changes(session, flush_context):
+    # Счетчики обновляются в той же транзакции, что и данные, поэтому все воркеры видят их согласованно
+    tags = set()
+    comment_deltas = {}
+    category_ids = set()
+    category_deltas = {}
+    today_bounds = get_today_bounds()
+    for obj in session.new | session.dirty | session.deleted:
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Article):
+            tags.update(article_cache_tags(obj))
+            # Счетчики категорий меняют новые и удаленные статьи и перенос в другую категорию
+            old_category_ids = db.inspect(obj).attrs.category_id.history.deleted
+            category_ids.update([obj.category_id, *old_category_ids])
+            if obj in session.new:
+                add_category_delta(category_deltas, obj.category_id, 1, obj.created_date, today_bounds)
+            elif obj in session.deleted:
+                add_category_delta(category_deltas, (old_category_ids or [obj.category_id])[0], -1,
+                                   obj.created_date, today_bounds)
+            elif old_category_ids:
+                add_category_delta(category_deltas, old_category_ids[0], -1, obj.created_date, today_bounds)
+                add_category_delta(category_deltas, obj.category_id, 1, obj.created_date, today_bounds)
+        elif isinstance(obj, Comment):
+            delta = 1 if obj in session.new else -1 if obj in session.deleted else 0
+            comment_deltas[obj.article_id] = comment_deltas.get(obj.article_id, 0) + delta
+
+    # Изменилась роль или пользователь удален - сбрасываем кэш ролей после коммита
+    role_changes = session.info.setdefault('role_changes', set())
+    for obj in session.dirty | session.deleted:
+        if isinstance(obj, User) and (obj in session.deleted or db.inspect(obj).attrs.is_admin.history.has_changes()):
+            role_changes.add(obj.id)
+        # Имя автора выводится в списках статей
+        if isinstance(obj, User) and obj in session.dirty and db.inspect(obj).attrs.name.history.has_changes():
+            tags.update({'articles', f'author:{obj.id}'})
+
+    connection = session.connection()
+    if category_ids:
+        tags.update(category_cache_tags(connection, category_ids))
+    if category_deltas:
+        tags.update(apply_category_deltas(connection, category_deltas))
+    if comment_deltas:
+        tags.update(apply_comment_deltas(connection, comment_deltas))
+    if tags:
+        bump_change_counters(connection, tags)
+
+
+# Просмотры статей: накапливаются счетчиком (view_counter.py) и записываются пачками
+POPULAR_DAYS = 7
+POPULAR_CACHE_MAX_ENTRIES = 100
+flusher_lock = threading.Lock()
+
+
+def get_view_counter():
+    return current_app.extensions.get('view_counter')
+
+
+def record_view(article_id):
+    """Учитывает просмотр без записи в базу; при первом просмотре запускает фоновую выгрузку"""
+    counter = get_view_counter()
+    if counter is None:
+        return
+    counter.add(article_id)
+    app = current_app._get_current_object()
+    interval = app.config['VIEW_FLUSH_INTERVAL']
+    if interval > 0 and 'view_flusher' not in app.extensions:
+        with flusher_lock:
+            if 'view_flusher' not in app.extensions:
+                def flush():
+                    with app.app_context():
+                        flush_views()
+                flusher = PeriodicFlusher(flush, interval)
+                app.extensions['view_flusher'] = flusher
+                flusher.start()
+                # Накопленные просмотры записываются и при остановке процесса
+                atexit.register(flusher.stop)
+
+
+def count_view(f):
+    """Учитывает просмотр статьи; ставится перед cached_page, чтобы считались и ответы из кэша"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record_view(kwargs['id'])
+        return response
+    return decorated_function
+
+
+def flush_views():
+    """
+    Записывает накопленные просмотры одной транзакцией: прибавляет их к articles.views
+    и к дневным счетчикам article_view_days и удаляет дни старше недели. Теги страниц не сбрасываются:
+    рейтинг популярных статей обновляется по времени (POPULAR_CACHE_TTL).
+    При ошибке просмотры возвращаются в счетчик до следующей выгрузки. Возвращает число просмотров.
+    """
+    counter = get_view_counter()
+    counts = counter.drain() if counter is not None else {}
+    if not counts:
+        return 0
+
+    articles = Article.__table__
+    view_days = ArticleViewDay.__table__
+    today = get_local_datetime().date()
+    written = 0
+    try:
+        connection = db.session.connection()
+        ids = sorted(counts)
+        for start in range(0, len(ids), CHANGE_COUNTER_CHUNK):
+            chunk = ids[start:start + CHANGE_COUNTER_CHUNK]
+            # Просмотры удаленных статей отбрасываются
+            existing = set(connection.execute(db.select(articles.c.id).where(articles.c.id.in_(chunk))).scalars())
+            if not existing:
+                continue
+            rows = [{'b_id': article_id, 'b_views': counts[article_id]} for article_id in sorted(existing)]
+            written += sum(row['b_views'] for row in rows)
+            connection.execute(articles.update()
+                               .where(articles.c.id == db.bindparam('b_id'))
+                               .values(views=articles.c.views + db.bindparam('b_views')), rows)
+
+            counted = set(connection.execute(
+                db.select(view_days.c.article_id)
+                .where(view_days.c.day == today, view_days.c.article_id.in_(existing))
+            ).scalars())
+            updates = [row for row in rows if row['b_id'] in counted]
+            if updates:
+                connection.execute(view_days.update()
+                                   .where(view_days.c.article_id == db.bindparam('b_id'), view_days.c.day == today)
+                                   .values(views=view_days.c.views + db.bindparam('b_views')), updates)
+            inserts = [{'article_id': row['b_id'], 'day': today, 'views': row['b_views']}
+                       for row in rows if row['b_id'] not in counted]
+            if inserts:
+                connection.execute(view_days.insert(), inserts)
+
+        connection.execute(view_days.delete().where(view_days.c.day <= today - timedelta(days=POPULAR_DAYS)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        counter.restore(counts)
+        logging.getLogger(__name__).exception('Не удалось записать просмотры, повтор при следующей выгрузке')
+        return 0
+    return written
+
+
+def get_popular_generation():
+    """
+    Поколение рейтинга популярных статей: номер интервала POPULAR_CACHE_TTL секунд от эпохи
+    и начало интервала (UTC). Номер одинаков во всех воркерах, поэтому совпадают и ETag страниц.
+    Значение запоминается до конца запроса, чтобы ключ страницы и рейтинг на ней не разошлись.
+    """
+    if 'popular_generation' not in g:
+        ttl = max(current_app.config['POPULAR_CACHE_TTL'], 1)
+        generation = int(datetime.now(timezone.utc).timestamp() // ttl)
+        g.popular_generation = (generation, datetime.fromtimestamp(generation * ttl, timezone.utc))
+    return g.popular_generation
 
 
-# Вспомогательная функция для преобразования статьи из БД в формат для шаблонов
-def article_to_dict(article):
+def get_popular_articles(category_id=None, limit=None):
+    """
+    Самые просматриваемые статьи за последние POPULAR_DAYS дней (всего или в категории с id category_id).
+    Рейтинг кэшируется в процессе по дню и поколению (get_popular_generation): он пересчитывается
+    раз в POPULAR_CACHE_TTL секунд и в полночь, когда сдвигается окно недели, а не при каждой выгрузке просмотров.
+    """
+    limit = limit or current_app.config['POPULAR_ARTICLES_LIMIT']
+    today = get_local_datetime().date()
+    version = (today, get_popular_generation()[0])
+
+    cache = current_app.extensions['popular_cache']
+    key = (category_id, limit)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    since = today - timedelta(days=POPULAR_DAYS - 1)
+    weekly_views = db.func.sum(ArticleViewDay.views).label('weekly_views')
+    query = (db.select(Article.id, Article.title, Category.name.label('category'), weekly_views)
+             .join(ArticleViewDay, ArticleViewDay.article_id == Article.id)
+             .join(Category, Category.id == Article.category_id)
+             .where(ArticleViewDay.day >= since)
+             .group_by(Article.id, Article.title, Category.name)
+             .order_by(weekly_views.desc(), Article.id.desc())
+             .limit(limit))
+    if category_id:
+        query = query.where(Article.category_id == category_id)
+    popular = [{'id': row.id, 'title': row.title, 'category': row.category, 'views': row.weekly_views}
+               for row in db.session.execute(query)]
+
+    if len(cache) >= POPULAR_CACHE_MAX_ENTRIES:
+        cache.clear()
+    cache[key] = (version, popular)
+    return popular
+
+
+# Каталог статей в памяти (ARTICLE_CATALOG): списки статей без запросов к базе.
+# Каталог согласуется с базой по версии тега 'articles': если она изменилась, дочитываются
+# статьи, теги которых ('article:<id>', 'comments:<id>', 'author:<id>') изменились после watermark.
+# Статьи, измененные в этом же процессе, помечаются ORM-событиями и перечитываются сразу.
+CATALOG_SYNC_OVERLAP = timedelta(seconds=5)
+CATALOG_TAG_PREFIXES = ('article:', 'comments:', 'author:')
+
+
+def catalog_projection():
+    return (db.select(Article.id, Article.title, Article.created_date, Article.excerpt, Article.word_count,
+                      Article.user_id, Article.category_id, Category.name, Category.slug, Article.comment_count,
+                      User.name)
+            .join(User, User.id == Article.user_id)
+            .join(Category, Category.id == Article.category_id))
+
+
+def load_catalog(catalog):
+    # Версия и время читаются до строк: изменения, пришедшие во время загрузки, подхватит следующая синхронизация
+    version = get_change_validators(['articles'])[0].get('articles', 0)
+    watermark = db.session.execute(db.select(db.func.max(ChangeCounter.changed_at))).scalar()
+    catalog.load(db.session.execute(catalog_projection().execution_options(yield_per=CHANGE_COUNTER_CHUNK)),
+                 version, watermark)
+
+
+def sync_catalog(catalog, version):
+    """Дочитывает статьи, измененные в этом процессе и (если версия 'articles' другая) в остальных"""
+    article_ids = catalog.take_stale()
+    author_ids = set()
+    watermark = catalog.watermark
+    if version != catalog.version:
+        query = db.select(ChangeCounter.tag, ChangeCounter.changed_at).where(
+            db.or_(*[ChangeCounter.tag.startswith(prefix) for prefix in CATALOG_TAG_PREFIXES]))
+        # Перекрытие покрывает транзакции, которые взяли время раньше, а закоммитились позже
+        if watermark is not None:
+            query = query.where(ChangeCounter.changed_at >= watermark - CATALOG_SYNC_OVERLAP)
+        for tag, changed_at in db.session.execute(query):
+            prefix, tag_id = tag.split(':', 1)
+            (author_ids if prefix == 'author' else article_ids).add(int(tag_id))
+            watermark = max(watermark, changed_at) if watermark else changed_at
+
+    article_ids = sorted(article_ids)
+    for start in range(0, len(article_ids), CHANGE_COUNTER_CHUNK):
+        chunk = article_ids[start:start + CHANGE_COUNTER_CHUNK]
+        found = set()
+        for row in db.session.execute(catalog_projection().where(Article.id.in_(chunk))):
+            catalog.upsert(row)
+            found.add(row.id)
+        for article_id in set(chunk) - found:
+            catalog.remove(article_id)
+    if author_ids:
+        for user_id, name in db.session.execute(db.select(User.id, User.name).where(User.id.in_(author_ids))):
+            catalog.rename_author(user_id, name)
+    catalog.version, catalog.watermark = version, watermark
+
+
+def get_article_catalog():
+    """Каталог, согласованный с базой на момент запроса, или None, если ARTICLE_CATALOG выключен"""
+    catalog = current_app.extensions.get('article_catalog')
+    if catalog is None:
+        return None
+    versions = g.get('change_versions')
+    if versions is None or 'articles' not in versions:
+        versions, _ = get_change_validators(['articles'])
+    version = versions.get('articles', 0)
+    if not catalog.loaded or version != catalog.version or catalog.has_stale():
+        with catalog.sync_lock:
+            if not catalog.loaded:
+                load_catalog(catalog)
+            elif version != catalog.version or catalog.has_stale():
+                sync_catalog(catalog, version)
+    return catalog
+
+
+def paginate_catalog(catalog, category_id=None, before=None, after=None, per_page=None):
+    """То же, что paginate_articles, но по каталогу в памяти"""
+    per_page = per_page or current_app.config['ARTICLES_PER_PAGE']
+    articles, has_older, has_newer = catalog.page(category_id, decode_cursor(before), decode_cursor(after), per_page)
     return {
+        'articles': articles,
+        'older': encode_cursor(articles[-1].created_date, articles[-1].id) if articles and has_older else None,
+        'newer': encode_cursor(articles[0].created_date, articles[0].id) if articles and has_newer else None,
+    }
+
+
+@event.listens_for(Article, 'after_insert')
+@event.listens_for(Article, 'after_update')
+@event.listens_for(Article, 'after_delete')
+def track_catalog_article(mapper, connection, article):
+    db.inspect(article).session.info.setdefault('catalog_ids', set()).add(article.id)
+
+
+@event.listens_for(Comment, 'after_insert')
+@event.listens_for(Comment, 'after_delete')
+def track_catalog_comment(mapper, connection, comment):
+    db.inspect(comment).session.info.setdefault('catalog_ids', set()).add(comment.article_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_catalog_changes(session):
+    article_ids = session.info.pop('catalog_ids', ())
+    catalog = current_app.extensions.get('article_catalog') if has_app_context() else None
+    if article_ids and catalog is not None:
+        catalog.mark_stale(article_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_catalog_changes(session):
+    session.info.pop('catalog_ids', None)
+
+
+# Справочник категорий в процессе: категории с числом статей и HTML блока фильтра.
+# Кэш обновляется при изменении тега 'categories' (статья добавлена, удалена или перенесена) и в полночь.
+def get_category_registry():
+    versions = g.get('change_versions')
+    if versions is None or 'categories' not in versions:
+        versions, _ = get_change_validators(['categories'])
+        # Версия запоминается до конца запроса: справочник нужен и формам, и проверке категории
+        g.change_versions = {**g.get('change_versions', {}), 'categories': versions.get('categories', 0)}
+    key = (versions.get('categories', 0), get_local_datetime().date())
+
+    cache = current_app.extensions['category_cache']
+    registry = cache.get('registry')
+    if registry is not None and registry['key'] == key:
+        return registry
+
+    today = key[1]
+    categories = [{'id': category.id, 'name': category.name, 'slug': category.slug,
+                   'article_count': category.article_count,
+                   'today_count': category.today_count if category.today_date == today else 0}
+                  for category in db.session.execute(
+                      db.select(Category).order_by(Category.position, Category.id)).scalars()]
+    registry = {'key': key, 'categories': categories,
+                'by_id': {category['id']: category for category in categories},
+                'by_slug': {category['slug']: category for category in categories},
+                'by_name': {category['name']: category for category in categories},
+                'facets': {}}
+    cache['registry'] = registry
+    return registry
+
+
+def get_categories():
+    """Категории по порядку: словари id, name, slug, article_count, today_count"""
+    return get_category_registry()['categories']
+
+
+def find_category(value):
+    """Категория по slug или по названию; None, если такой нет"""
+    registry = get_category_registry()
+    return registry['by_slug'].get(value) or registry['by_name'].get(value)
+
+
+def render_category_facets(active=None):
+    """
+    Блок фильтра категорий с числом статей. HTML кэшируется вместе со справочником
+    для каждой активной категории, поэтому запрос страницы не считает статьи.
+    """
+    registry = get_category_registry()
+    facets = registry['facets']
+    if active not in facets:
+        facets[active] = Markup(render_template('category_facets.html',
+                                                categories=registry['categories'],
+                                                total=sum(category['article_count']
+                                                          for category in registry['categories']),
+                                                active=active))
+    return facets[active]
+
+
+# Вспомогательная функция для преобразования статьи из БД в формат для шаблонов.
+# with_content=True добавляет HTML статьи - только для страницы статьи, списки текст не загружают
+def article_to_dict(article, with_content=False):
+    today_start, tomorrow_start = get_today_bounds()
+    result = {
         'id': article.id,
         'title': article.title,
         'date': article.created_date.strftime('%d %B %Y'),
-        'excerpt': article.excerpt or article.text[:100] + '...',
-        'content': f'<p>{article.text}</p>',
+        'is_today': today_start <= article.created_date < tomorrow_start,
+        'excerpt': article.excerpt or '',
+        'word_count': article.word_count,
         'author_id': article.user_id,
-        'category': article.category,
-        'author_name': article.author.name
+        'category': article.category.name,
+        'category_slug': article.category.slug,
+        'author_name': article.author.name,
+        'comment_count': article.comment_count
     }
+    if with_content:
+        # Строки, вставленные в обход ORM без HTML, рендерятся при показе
+        html = article.html if article.html is not None else render_article_html(article.text)
+        result['content'] = Markup(html)
+    return result
+
+
+class ArticleDicts:
+    """
+    Статьи страницы для шаблона: словари article_to_dict создаются по мере вывода, а не списком
+    заранее, поэтому при потоковом рендеринге длинного списка они не копятся в памяти
+    """
+
+    def __init__(self, articles):
+        self.articles = articles
+
+    def __len__(self):
+        return len(self.articles)
+
+    def __iter__(self):
+        return map(article_to_dict, self.articles)
+
+
+def render_page(template_name, **context):
+    """
+    Рендерит страницу целиком или, при STREAM_TEMPLATES, потоком: первые байты уходят клиенту
+    до того, как отрендерен весь документ, и документ не собирается в памяти целиком.
+    Страница с flash-сообщениями рендерится целиком: шаблон удаляет их из сессии,
+    а при потоке заголовок Set-Cookie к этому моменту уже отправлен.
+    """
+    if not current_app.config['STREAM_TEMPLATES'] or '_flashes' in session:
+        return render_template(template_name, **context)
+    chunks = coalesce_chunks(stream_template(template_name, **context), current_app.config['STREAM_CHUNK_SIZE'])
+    return current_app.response_class(chunks, mimetype='text/html')
 
 
 # Вспомогательная функция для преобразования комментария из БД в формат для шаблонов
@@ -262,6 +1645,85 @@ def comment_to_dict(comment):
     }
 
 
+# Курсор страницы: дата и id последней показанной записи (статьи или комментария)
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(moment, item_id):
+    return f'{moment.strftime(CURSOR_DATE_FORMAT)}-{item_id}'
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор вида '<дата>-<id>'.
+    Возвращает кортеж (datetime, id) или None, если курсор некорректен.
+    """
+    if not cursor:
+        return None
+    try:
+        moment, item_id = cursor.split('-', 1)
+        return datetime.strptime(moment, CURSOR_DATE_FORMAT), int(item_id)
+    except ValueError:
+        return None
+
+
+def paginate_articles(query, before=None, after=None, per_page=None):
+    """
+    Keyset-пагинация по (created_date, id) от новых статей к старым.
+    before - курсор для перехода к более старым статьям,
+    after - курсор для перехода к более новым.
+    Стоимость страницы зависит только от per_page, а не от её номера (без OFFSET).
+    """
+    per_page = per_page or current_app.config['ARTICLES_PER_PAGE']
+    key = db.tuple_(Article.created_date, Article.id)
+    before_key = decode_cursor(before)
+    after_key = decode_cursor(after)
+
+    if after_key:
+        rows = (query.filter(key > after_key)
+                .order_by(Article.created_date.asc(), Article.id.asc())
+                .limit(per_page + 1)
+                .all())
+        has_newer = len(rows) > per_page
+        articles = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if before_key:
+            query = query.filter(key < before_key)
+        rows = (query.order_by(Article.created_date.desc(), Article.id.desc())
+                .limit(per_page + 1)
+                .all())
+        has_older = len(rows) > per_page
+        articles = rows[:per_page]
+        has_newer = before_key is not None
+
+    return {
+        'articles': articles,
+        'older': encode_cursor(articles[-1].created_date, articles[-1].id) if articles and has_older else None,
+        'newer': encode_cursor(articles[0].created_date, articles[0].id) if articles and has_newer else None,
+    }
+
+
+def paginate_comments(article_id, before=None, per_page=None):
+    """
+    Keyset-пагинация комментариев статьи по (date, id) от новых к старым
+    по индексу (article_id, date). before - курсор последнего показанного комментария.
+    """
+    per_page = per_page or current_app.config['COMMENTS_PER_PAGE']
+    query = Comment.query.filter(Comment.article_id == article_id)
+    before_key = decode_cursor(before)
+    if before_key:
+        query = query.filter(db.tuple_(Comment.date, Comment.id) < before_key)
+    rows = (query.order_by(Comment.date.desc(), Comment.id.desc())
+            .limit(per_page + 1)
+            .all())
+    comments = rows[:per_page]
+    return {
+        'comments': comments,
+        'older': encode_cursor(comments[-1].date, comments[-1].id) if len(rows) > per_page else None,
+    }
+
+
 def is_today_article(article_date):
     """
     Проверяет, является ли дата статьи сегодняшней.
@@ -311,6 +1773,8 @@ def validate_article_form(title, content, category):
         errors['content'] = 'Статья должна содержать минимум 50 символов'
     if not category.strip():
         errors['category'] = 'Необходимо выбрать категорию'
+    elif find_category(category) is None:
+        errors['category'] = 'Такой категории нет'
     return errors
 
 
@@ -362,10 +1826,10 @@ def validate_login_form(email, password):
 
 
 # Маршруты аутентификации
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if 'user_id' in session:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
@@ -389,20 +1853,25 @@ def register():
                 db.session.commit()
 
                 flash('Регистрация прошла успешно! Теперь вы можете войти.', 'success')
-                return redirect(url_for('login'))
+                return redirect(url_for('main.login'))
+
+            except KdfPoolBusy:
+                db.session.rollback()
+                flash('Сервер перегружен, попробуйте зарегистрироваться через минуту', 'error')
+                return render_template('register.html', name=name, email=email), 503
 
             except Exception as e:
                 db.session.rollback()
                 flash(f'Ошибка при регистрации: {str(e)}', 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
 
     return render_template('register.html')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         email = request.form.get('email', '').strip()
@@ -417,61 +1886,88 @@ def login():
         else:
             user = User.query.filter_by(email=email).first()
 
-            if user and user.check_password(password):
+            try:
+                password_ok = user is not None and user.check_password(password)
+                # Параметры хеширования поменялись - пересчитываем хеш, пока знаем пароль
+                if password_ok and user.password_needs_rehash():
+                    user.set_password(password)
+                    db.session.commit()
+            except KdfPoolBusy:
+                db.session.rollback()
+                flash('Сервер перегружен, попробуйте войти через минуту', 'error')
+                return render_template('login.html', email=email), 503
+
+            if password_ok:
                 session['user_id'] = user.id
                 session['user_name'] = user.name
                 session['is_admin'] = user.is_admin
 
                 flash(f'Добро пожаловать, {user.name}!', 'success')
-                return redirect(url_for('index'))
+                return redirect(url_for('main.index'))
             else:
                 flash('Неверный email или пароль', 'error')
-                return redirect(url_for('login'))
+                return redirect(url_for('main.login'))
 
     return render_template('login.html')
 
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.clear()
     flash('Вы успешно вышли из системы', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
 
 # Основные маршруты
-@app.route('/')
+@bp.route('/')
+@cached_page(lambda: ['articles'], popular=True)
 def index():
-    articles = Article.query.order_by(Article.created_date.desc()).all()
-    today_articles = [article for article in articles if is_today_article(article.created_date)]
+    # Выбираем только сегодняшние статьи по индексу created_date, а не весь архив
+    today_start, tomorrow_start = get_today_bounds()
+    catalog = get_article_catalog()
+    if catalog is not None:
+        today_articles = catalog.between(today_start, tomorrow_start)
+    else:
+        today_articles = (Article.query
+                          .options(joinedload(Article.author))
+                          .filter(Article.created_date >= today_start, Article.created_date < tomorrow_start)
+                          .order_by(Article.created_date.desc())
+                          .all())
     return render_template('index.html',
                            today_articles=[article_to_dict(article) for article in today_articles],
+                           popular_articles=get_popular_articles(),
                            current_date=date.today())
 
 
-@app.route('/news')
+@bp.route('/news')
+@cached_page(lambda: ['articles', 'categories'])
 def news():
-    articles = Article.query.order_by(Article.created_date.desc()).all()
-    articles_dict = [article_to_dict(article) for article in articles]
-
-    print("=== ОТЛАДОЧНАЯ ИНФОРМАЦИЯ ===")
-    print(f"Сегодня: {date.today()}")
-    print(f"Всего статей: {len(articles)}")
-    for article in articles:
-        print(
-            f"Статья '{article.title}': {article.created_date.date()} (сегодняшняя: {is_today_article(article.created_date)})")
-    print("=============================")
-
-    return render_template('news.html',
-                           articles=articles_dict,
-                           is_today_article=is_today_article,
-                           current_date=date.today())
-
-
-@app.route('/news/<int:id>', methods=['GET', 'POST'])
+    catalog = get_article_catalog()
+    if catalog is not None:
+        page = paginate_catalog(catalog, before=request.args.get('before'), after=request.args.get('after'))
+    else:
+        # Авторов подгружаем тем же запросом, чтобы article_to_dict не делал N+1 запросов
+        page = paginate_articles(Article.query.options(joinedload(Article.author)),
+                                 before=request.args.get('before'),
+                                 after=request.args.get('after'))
+    return render_page('news.html',
+                       articles=ArticleDicts(page['articles']),
+                       older_cursor=page['older'],
+                       newer_cursor=page['newer'],
+                       category_facets=render_category_facets(),
+                       current_date=date.today())
+
+
+@bp.route('/news/<int:id>', methods=['GET', 'POST'])
+@count_view
+@cached_page(lambda id: [f'article:{id}', f'comments:{id}'])
 def news_article(id):
-    article = Article.query.get(id)
+    article = db.session.get(Article, id, options=[joinedload(Article.author), undefer(Article.html)])
 
     if request.method == 'POST':
+        # Комментировать можно только существующую статью; страница-заглушка есть только для просмотра
+        if article is None:
+            abort(404)
         # Для комментариев авторизация не требуется
         author_name = request.form.get('author_name', '').strip()
         text = request.form.get('text', '').strip()
@@ -483,15 +1979,9 @@ def news_article(id):
         errors = validate_comment_form(author_name, text)
 
         if errors:
-            comments = Comment.query.filter_by(article_id=id).order_by(Comment.date.desc()).all()
-            return render_template('news_article.html',
-                                   article=article_to_dict(article),
-                                   comments=[comment_to_dict(comment) for comment in comments],
-                                   is_today_article=is_today_article,
-                                   current_date=date.today(),
-                                   errors=errors,
-                                   author_name=author_name,
-                                   text=text)
+            return render_comment_form(article, errors, author_name, text)
+        elif 'comment_queue' in current_app.extensions:
+            return enqueue_comment(article, author_name, text)
         else:
             try:
                 new_comment = Comment(
@@ -505,38 +1995,120 @@ def news_article(id):
                 db.session.commit()
 
                 flash('Комментарий успешно добавлен!', 'success')
-                return redirect(url_for('news_article', id=id))
+                return redirect(url_for('main.news_article', id=id))
 
             except Exception as e:
                 db.session.rollback()
                 flash(f'Ошибка при добавлении комментария: {str(e)}', 'error')
-                return redirect(url_for('news_article', id=id))
+                return redirect(url_for('main.news_article', id=id))
 
     if article:
-        comments = Comment.query.filter_by(article_id=id).order_by(Comment.date.desc()).all()
+        comments_page = paginate_comments(id, before=request.args.get('comments_before'))
 
-        return render_template('news_article.html',
-                               article=article_to_dict(article),
-                               comments=[comment_to_dict(comment) for comment in comments],
-                               is_today_article=is_today_article,
-                               current_date=date.today())
+        return render_page('news_article.html',
+                           article=article_to_dict(article, with_content=True),
+                           comments=[comment_to_dict(comment) for comment in comments_page['comments']],
+                           comments_older=comments_page['older'],
+                           current_date=date.today())
     else:
         return render_template('news_article.html',
                                article={'id': id, 'title': f'Статья {id}',
                                         'date': datetime.now().strftime('%d %B %Y'),
+                                        'is_today': True,
                                         'content': f'<p>Статья с ID {id} находится в разработке. Скоро здесь появится интересный контент!</p>',
-                                        'author_name': 'Неизвестный автор'},
+                                        'author_name': 'Неизвестный автор',
+                                        'comment_count': 0},
                                comments=[],
-                               is_today_article=is_today_article,
                                current_date=date.today())
 
 
-@app.route('/about')
+def render_comment_form(article, errors, author_name, text):
+    """Страница статьи с формой комментария, заполненной отправленными данными"""
+    comments_page = paginate_comments(article.id)
+    return render_template('news_article.html',
+                           article=article_to_dict(article, with_content=True),
+                           comments=[comment_to_dict(comment) for comment in comments_page['comments']],
+                           comments_older=comments_page['older'],
+                           current_date=date.today(),
+                           errors=errors,
+                           author_name=author_name,
+                           text=text)
+
+
+def write_comment_batch(app, items):
+    """
+    Записывает пачку комментариев из очереди одной транзакцией и возвращает их id.
+    Число комментариев статей и счетчики изменений обновляет track_data_changes.
+    """
+    with app.app_context():
+        comments = [Comment(**item) for item in items]
+        db.session.add_all(comments)
+        try:
+            db.session.flush()
+            ids = [comment.id for comment in comments]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return ids
+
+
+def enqueue_comment(article, author_name, text):
+    """
+    Ставит комментарий в очередь группового коммита (COMMENT_WRITE_MODE='queue').
+    С COMMENT_QUEUE_WAIT ответ отправляется после коммита, как и при синхронной записи;
+    без него - сразу, и комментарий может потеряться при аварийной остановке процесса.
+    """
+    item = {'text': text, 'author_name': author_name, 'article_id': article.id,
+            'user_id': session.get('user_id'), 'date': get_local_datetime()}
+    try:
+        future = current_app.extensions['comment_queue'].submit(item)
+    except WriteQueueFull:
+        flash('Сервер перегружен, попробуйте отправить комментарий через минуту', 'error')
+        return render_comment_form(article, {}, author_name, text), 503
+
+    if not current_app.config['COMMENT_QUEUE_WAIT']:
+        flash('Комментарий принят и скоро появится', 'success')
+        return redirect(url_for('main.news_article', id=article.id))
+
+    try:
+        future.result(timeout=current_app.config['COMMENT_QUEUE_TIMEOUT'])
+    except FutureTimeoutError:
+        # Комментарий, который еще не начали записывать, снимаем с очереди, чтобы не было дубля при повторе
+        if future.cancel():
+            flash('Сервер перегружен, попробуйте отправить комментарий через минуту', 'error')
+            return render_comment_form(article, {}, author_name, text), 503
+        flash('Комментарий принят и скоро появится', 'success')
+        return redirect(url_for('main.news_article', id=article.id))
+    except Exception as e:
+        flash(f'Ошибка при добавлении комментария: {str(e)}', 'error')
+        return redirect(url_for('main.news_article', id=article.id))
+
+    flash('Комментарий успешно добавлен!', 'success')
+    return redirect(url_for('main.news_article', id=article.id))
+
+
+# Следующие страницы комментариев: HTML-фрагмент или JSON (?format=json)
+@bp.route('/news/<int:id>/comments')
+@cached_page(lambda id: [f'comments:{id}'])
+def article_comments(id):
+    comments_page = paginate_comments(id, before=request.args.get('before'))
+    comments = [comment_to_dict(comment) for comment in comments_page['comments']]
+
+    if request.args.get('format') == 'json':
+        return jsonify(comments=comments, older=comments_page['older'])
+    return render_template('comments_page.html',
+                           article_id=id,
+                           comments=comments,
+                           comments_older=comments_page['older'])
+
+
+@bp.route('/about')
 def about():
     return render_template('about.html')
 
 
-@app.route('/feedback', methods=['GET', 'POST'])
+@bp.route('/feedback', methods=['GET', 'POST'])
 def feedback():
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
@@ -562,7 +2134,7 @@ def feedback():
 
 
 # Защищенные маршруты
-@app.route('/create-article', methods=['GET', 'POST'])
+@bp.route('/create-article', methods=['GET', 'POST'])
 @login_required
 def create_article():
     if request.method == 'POST':
@@ -580,14 +2152,14 @@ def create_article():
                                    category=category,
                                    excerpt=excerpt,
                                    errors=errors,
-                                   categories=CATEGORIES)
+                                   categories=get_categories())
         else:
             try:
                 new_article = Article(
                     title=title,
                     text=content,
-                    excerpt=excerpt or content[:100] + '...',
-                    category=category,
+                    excerpt=excerpt or None,
+                    category_id=find_category(category)['id'],
                     user_id=session['user_id']  # Автор - текущий пользователь
                 )
 
@@ -595,29 +2167,29 @@ def create_article():
                 db.session.commit()
 
                 flash('Статья успешно создана!', 'success')
-                return redirect(url_for('news_article', id=new_article.id))
+                return redirect(url_for('main.news_article', id=new_article.id))
 
             except Exception as e:
                 db.session.rollback()
                 flash(f'Ошибка при создании статьи: {str(e)}', 'error')
-                return redirect(url_for('create_article'))
+                return redirect(url_for('main.create_article'))
 
-    return render_template('create_article.html', categories=CATEGORIES)
+    return render_template('create_article.html', categories=get_categories())
 
 
-@app.route('/edit-article/<int:id>', methods=['GET', 'POST'])
+@bp.route('/edit-article/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit_article(id):
     article = Article.query.get(id)
 
     if not article:
         flash('Статья не найдена!', 'error')
-        return redirect(url_for('news'))
+        return redirect(url_for('main.news'))
 
     # Проверяем, является ли пользователь автором статьи или администратором
     if article.user_id != session['user_id'] and not session.get('is_admin'):
         flash('Вы можете редактировать только свои статьи!', 'error')
-        return redirect(url_for('news_article', id=id))
+        return redirect(url_for('main.news_article', id=id))
 
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
@@ -635,34 +2207,35 @@ def edit_article(id):
                                    category=category,
                                    excerpt=excerpt,
                                    errors=errors,
-                                   categories=CATEGORIES)
+                                   categories=get_categories())
         else:
             try:
                 article.title = title
                 article.text = content
-                article.excerpt = excerpt or content[:100] + '...'
-                article.category = category
+                article.excerpt = excerpt or None
+                article.category_id = find_category(category)['id']
 
                 db.session.commit()
 
                 flash('Статья успешно обновлена!', 'success')
-                return redirect(url_for('news_article', id=id))
+                return redirect(url_for('main.news_article', id=id))
 
             except Exception as e:
                 db.session.rollback()
                 flash(f'Ошибка при обновлении статьи: {str(e)}', 'error')
-                return redirect(url_for('edit_article', id=id))
+                return redirect(url_for('main.edit_article', id=id))
 
     return render_template('edit_article.html',
                            article=article_to_dict(article),
                            title=article.title,
                            content=article.text,
-                           category=article.category,
-                           excerpt=article.excerpt,
-                           categories=CATEGORIES)
+                           category=article.category.slug,
+                           # Вычисленный анонс в форму не подставляется, иначе он вернется как авторский
+                           excerpt=article.excerpt if article.excerpt_manual else '',
+                           categories=get_categories())
 
 
-@app.route('/delete-article/<int:id>')
+@bp.route('/delete-article/<int:id>')
 @login_required
 def delete_article(id):
     try:
@@ -670,14 +2243,17 @@ def delete_article(id):
 
         if not article:
             flash('Статья не найдена!', 'error')
-            return redirect(url_for('news'))
+            return redirect(url_for('main.news'))
 
         # Проверяем, является ли пользователь автором статьи или администратором
         if article.user_id != session['user_id'] and not session.get('is_admin'):
             flash('Вы можете удалять только свои статьи!', 'error')
-            return redirect(url_for('news_article', id=id))
+            return redirect(url_for('main.news_article', id=id))
 
         if article:
+            # Комментарии удаляет ON DELETE CASCADE; если SQLITE_PRAGMAS не включают foreign_keys - удаляем сами
+            if not foreign_keys_enforced(db.session.connection()):
+                db.session.execute(Comment.__table__.delete().where(Comment.__table__.c.article_id == id))
             db.session.delete(article)
             db.session.commit()
             flash('Статья успешно удалена!', 'success')
@@ -688,11 +2264,11 @@ def delete_article(id):
         db.session.rollback()
         flash(f'Ошибка при удалении статьи: {str(e)}', 'error')
 
-    return redirect(url_for('news'))
+    return redirect(url_for('main.news'))
 
 
 # Демонстрация работы с моделями
-@app.route('/demo-db')
+@bp.route('/demo-db')
 def demo_db():
     users = User.query.all()
     articles = Article.query.all()
@@ -701,17 +2277,982 @@ def demo_db():
     return render_template('demo_db.html', users=users, articles=articles, comments=comments)
 
 
+# Сводка метрик по маршрутам (суммы по выбранным запросам).
+# Доступна администратору и адресам из METRICS_ALLOWED_IPS (например, сборщику метрик)
+@bp.route('/metrics')
+def metrics():
+    if request.remote_addr not in current_app.config['METRICS_ALLOWED_IPS'] and not (
+            'user_id' in session and is_admin_user(session['user_id'])):
+        abort(403)
+    with request_metrics_lock:
+        snapshot = {endpoint: dict(stats) for endpoint, stats in request_metrics.items()}
+    return jsonify(sample_rate=current_app.config['METRICS_SAMPLE_RATE'], endpoints=snapshot)
+
+
+def category_or_redirect(slug):
+    """
+    Категория по slug из адреса. Старые адреса с названием категории (/category/Мода)
+    перенаправляются на адрес со slug, неизвестная категория - 404.
+    """
+    category = find_category(slug)
+    if category is None:
+        abort(404)
+    if category['slug'] != slug:
+        abort(redirect(url_for(request.endpoint, **{**request.view_args, **request.args.to_dict(),
+                                                   'slug': category['slug']}), 301))
+    return category
+
+
 # Маршрут для фильтрации по категориям
-@app.route('/category/<category_name>')
-def category_news(category_name):
-    articles = Article.query.filter_by(category=category_name).order_by(Article.created_date.desc()).all()
-
-    return render_template('category_news.html',
-                           articles=[article_to_dict(article) for article in articles],
-                           category_name=category_name,
-                           is_today_article=is_today_article,
-                           current_date=date.today())
+@bp.route('/category/<slug>')
+@cached_page(lambda slug: [f'category:{slug}', 'categories'], popular=True)
+def category_news(slug):
+    category = category_or_redirect(slug)
+    catalog = get_article_catalog()
+    if catalog is not None:
+        page = paginate_catalog(catalog, category['id'],
+                                before=request.args.get('before'), after=request.args.get('after'))
+    else:
+        page = paginate_articles(Article.query.options(joinedload(Article.author))
+                                 .filter_by(category_id=category['id']),
+                                 before=request.args.get('before'),
+                                 after=request.args.get('after'))
+
+    return render_page('category_news.html',
+                       articles=ArticleDicts(page['articles']),
+                       older_cursor=page['older'],
+                       newer_cursor=page['newer'],
+                       category=category,
+                       category_facets=render_category_facets(category['slug']),
+                       popular_articles=get_popular_articles(category['id']),
+                       current_date=date.today())
+
+
+# Ленты Atom: последние статьи сайта и категории
+def to_atom_date(moment):
+    """Дата в формате RFC 3339; даты в базе хранятся в локальном времени без часового пояса"""
+    return moment.astimezone().isoformat(timespec='seconds')
+
+
+def render_feed(query, title, page_url):
+    """Лента из последних FEED_ARTICLES статей запроса по индексу created_date"""
+    articles = (query.options(joinedload(Article.author), undefer(Article.html))
+                .order_by(Article.created_date.desc(), Article.id.desc())
+                .limit(current_app.config['FEED_ARTICLES'])
+                .all())
+    updated = articles[0].created_date if articles else get_local_datetime()
+    response = make_response(render_template('feed.xml',
+                                             articles=articles,
+                                             title=title,
+                                             page_url=page_url,
+                                             updated=to_atom_date(updated),
+                                             to_atom_date=to_atom_date))
+    response.mimetype = 'application/atom+xml'
+    return response
+
+
+@bp.route('/feed.xml')
+@cached_page(lambda: ['feed'], daily=False)
+def feed():
+    return render_feed(Article.query, 'Meow Blog', url_for('main.news', _external=True))
+
+
+@bp.route('/category/<slug>/feed.xml')
+@cached_page(lambda slug: [f'feed:{slug}'], daily=False)
+def category_feed(slug):
+    category = category_or_redirect(slug)
+    return render_feed(Article.query.filter_by(category_id=category['id']),
+                       f'Meow Blog: {category["name"]}',
+                       url_for('main.category_news', slug=category['slug'], _external=True))
+
+
+# Маршрут поиска по статьям
+@bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    page = max(page, 1)
+    found = search_articles(query, page=page) if query else {'results': [], 'has_next': False}
+
+    return render_template('search.html',
+                           query=query,
+                           articles=found['results'],
+                           page=page,
+                           has_next=found['has_next'])
+
+
+# JSON API: поля, которые можно запросить через ?fields=, и соответствующие им столбцы
+ARTICLE_API_COLUMNS = {
+    'id': Article.id,
+    'title': Article.title,
+    'date': Article.created_date,
+    'excerpt': Article.excerpt,
+    'text': Article.text,
+    'html': Article.html,
+    'word_count': Article.word_count,
+    'category': Category.name,
+    'author_id': Article.user_id,
+    'author_name': User.name,
+    'comment_count': Article.comment_count,
+}
+ARTICLE_API_LIST_FIELDS = ['id', 'title', 'date', 'excerpt', 'category', 'author_name', 'comment_count']
+ARTICLE_API_DETAIL_FIELDS = ARTICLE_API_LIST_FIELDS + ['text']
+
+COMMENT_API_COLUMNS = {
+    'id': Comment.id,
+    'text': Comment.text,
+    'date': Comment.date,
+    'author_name': Comment.author_name,
+    'article_id': Comment.article_id,
+}
+COMMENT_API_FIELDS = list(COMMENT_API_COLUMNS)
+
+API_MAX_LIMIT = 100
+JSONL_BATCH_SIZE = 1000
+
+
+def parse_fields(allowed, default):
+    """Разбирает ?fields=a,b,c; неизвестные поля - ошибка 400"""
+    raw = request.args.get('fields')
+    if not raw:
+        return default
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        abort(400, f'Неизвестные поля: {", ".join(unknown)}. Доступные поля: {", ".join(allowed)}')
+    return fields
+
+
+def select_fields(columns, fields, sort_date, sort_id):
+    """
+    SELECT только запрошенных столбцов (без загрузки ORM-объектов).
+    Ключ сортировки выбирается всегда - он нужен для курсора.
+    """
+    query = db.select(*[columns[field].label(field) for field in fields],
+                      sort_date.label('_sort_date'), sort_id.label('_sort_id'))
+    if 'author_name' in fields and columns is ARTICLE_API_COLUMNS:
+        query = query.join(User, User.id == Article.user_id)
+    if 'category' in fields and columns is ARTICLE_API_COLUMNS:
+        query = query.join(Category, Category.id == Article.category_id)
+    return query
+
+
+def serialize_row(row, fields):
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        item[field] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+
+def wants_jsonl():
+    return (request.args.get('format') == 'jsonl' or
+            request.accept_mimetypes.best == 'application/x-ndjson')
+
+
+def stream_jsonl(query, fields):
+    """Потоковая выдача JSON Lines: строки читаются с сервера пачками, память не растет с объемом выборки"""
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=JSONL_BATCH_SIZE))
+        for rows in result.partitions():
+            yield ''.join(json.dumps(serialize_row(row, fields), ensure_ascii=False) + '\n' for row in rows)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def api_list_response(query, fields, sort_date, sort_id):
+    """
+    Список с keyset-пагинацией по (дата, id) от новых к старым.
+    ?before= - курсор, ?limit= - размер страницы, ?format=jsonl - потоковая выдача всех записей.
+    """
+    before_key = decode_cursor(request.args.get('before'))
+    if before_key:
+        query = query.where(db.tuple_(sort_date, sort_id) < before_key)
+    query = query.order_by(sort_date.desc(), sort_id.desc())
+    limit = request.args.get('limit', type=int)
+
+    if wants_jsonl():
+        return stream_jsonl(query.limit(limit) if limit else query, fields)
+
+    limit = min(max(limit or current_app.config['ARTICLES_PER_PAGE'], 1), API_MAX_LIMIT)
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    last = rows[limit - 1] if len(rows) > limit else None
+    return jsonify(items=[serialize_row(row, fields) for row in rows[:limit]],
+                   next=encode_cursor(last._sort_date, last._sort_id) if last else None)
+
+
+@api.errorhandler(HTTPException)
+def api_error(error):
+    return jsonify(error=error.description, status=error.code), error.code
+
+
+@api.route('/articles')
+@cached_page(lambda: ['articles'], negotiate_format=True)
+def api_articles():
+    fields = parse_fields(ARTICLE_API_COLUMNS, ARTICLE_API_LIST_FIELDS)
+    query = select_fields(ARTICLE_API_COLUMNS, fields, Article.created_date, Article.id)
+    return api_list_response(query, fields, Article.created_date, Article.id)
+
+
+@api.route('/articles/<int:id>')
+@cached_page(lambda id: [f'article:{id}', f'comments:{id}'])
+def api_article(id):
+    fields = parse_fields(ARTICLE_API_COLUMNS, ARTICLE_API_DETAIL_FIELDS)
+    query = select_fields(ARTICLE_API_COLUMNS, fields, Article.created_date, Article.id).where(Article.id == id)
+    row = db.session.execute(query).first()
+    if row is None:
+        abort(404, f'Статья {id} не найдена')
+    return jsonify(serialize_row(row, fields))
+
+
+@api.route('/categories')
+@cached_page(lambda: ['categories'])
+def api_categories():
+    return jsonify(items=[{field: category[field] for field in ('name', 'slug', 'article_count', 'today_count')}
+                          for category in get_categories()])
+
+
+@api.route('/categories/<slug>')
+@cached_page(lambda slug: [f'category:{slug}'], negotiate_format=True)
+def api_category(slug):
+    category = find_category(slug)
+    if category is None:
+        abort(404, f'Категория {slug} не найдена')
+    if category['slug'] != slug:
+        return redirect(url_for('api.api_category', slug=category['slug'], **request.args.to_dict()), 301)
+    fields = parse_fields(ARTICLE_API_COLUMNS, ARTICLE_API_LIST_FIELDS)
+    query = (select_fields(ARTICLE_API_COLUMNS, fields, Article.created_date, Article.id)
+             .where(Article.category_id == category['id']))
+    return api_list_response(query, fields, Article.created_date, Article.id)
+
+
+@api.route('/articles/<int:id>/comments')
+@cached_page(lambda id: [f'comments:{id}'], negotiate_format=True)
+def api_article_comments(id):
+    fields = parse_fields(COMMENT_API_COLUMNS, COMMENT_API_FIELDS)
+    query = (select_fields(COMMENT_API_COLUMNS, fields, Comment.date, Comment.id)
+             .where(Comment.article_id == id))
+    return api_list_response(query, fields, Comment.date, Comment.id)
+
+
+# Экспорт и импорт данных (JSONL/CSV) для переноса и резервного копирования
+EXPORT_MODELS = {'users': User, 'articles': Article, 'comments': Comment}
+EXPORT_FORMATS = ('jsonl', 'csv')
+EXPORT_BATCH_SIZE = 1000
+
+
+def to_export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_table(table_name, fmt='jsonl', batch_size=EXPORT_BATCH_SIZE):
+    """
+    Генератор строк выгрузки таблицы. Строки читаются курсором пачками по batch_size,
+    поэтому память не зависит от размера таблицы.
+    """
+    table = EXPORT_MODELS[table_name].__table__
+    columns = [column.name for column in table.columns]
+    result = db.session.execute(db.select(table).order_by(table.c.id).execution_options(yield_per=batch_size))
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in result.partitions():
+            writer.writerows([to_export_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield ''.join(json.dumps({column: to_export_value(value) for column, value in zip(columns, row)},
+                                     ensure_ascii=False) + '\n'
+                          for row in rows)
+
+
+def read_records(stream, fmt):
+    """Построчно читает записи из текстового потока"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def convert_import_value(column, value):
+    """Приводит значение из JSONL/CSV к типу столбца"""
+    if value is None or (value == '' and column.nullable):
+        return None
+    if isinstance(value, str):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is bool:
+            return value.lower() in ('1', 'true', 'yes')
+        if python_type is int:
+            return int(value)
+    return value
+
+
+def validate_import_record(table_name, record):
+    """Проверяет запись теми же правилами, что и формы сайта. Возвращает словарь ошибок"""
+    if table_name == 'articles':
+        category = get_category_registry()['by_id'].get(record.get('category_id'))
+        errors = validate_article_form(record.get('title') or '', record.get('text') or '',
+                                       category['slug'] if category else '')
+        if not record.get('user_id'):
+            errors['user_id'] = 'Не указан автор статьи'
+    elif table_name == 'comments':
+        errors = validate_comment_form(record.get('author_name') or '', record.get('text') or '')
+        if not record.get('article_id'):
+            errors['article_id'] = 'Не указана статья'
+    else:
+        errors = {}
+        if not (record.get('name') or '').strip():
+            errors['name'] = 'Имя обязательно для заполнения'
+        if not validate_email(record.get('email') or ''):
+            errors['email'] = 'Введите корректный email адрес'
+        if not record.get('hashed_password'):
+            errors['hashed_password'] = 'Не указан хеш пароля'
+    return errors
+
+
+def insert_import_batch(table_name, rows):
+    """
+    Вставляет пачку строк через executemany (по одному запросу на набор столбцов)
+    и обновляет производные данные, которые обычно поддерживают ORM-события.
+    """
+    table = EXPORT_MODELS[table_name].__table__
+    connection = db.session.connection()
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    tags = set()
+    for group in groups.values():
+        if table_name == 'articles':
+            ids = connection.execute(table.insert().returning(table.c.id), group).scalars().all()
+            tags.add('articles')
+            tags.update(f'article:{article_id}' for article_id in ids)
+        else:
+            connection.execute(table.insert(), group)
+
+    if table_name == 'articles':
+        category_deltas = {}
+        today_bounds = get_today_bounds()
+        for row in rows:
+            add_category_delta(category_deltas, row['category_id'], 1, row.get('created_date'), today_bounds)
+        tags.update(category_cache_tags(connection, category_deltas))
+        tags.update(apply_category_deltas(connection, category_deltas))
+    if table_name == 'comments':
+        deltas = {}
+        for row in rows:
+            deltas[row['article_id']] = deltas.get(row['article_id'], 0) + 1
+        tags.update(apply_comment_deltas(connection, deltas))
+    if tags:
+        bump_change_counters(connection, tags)
+    db.session.commit()
+
+
+def import_table(table_name, stream, fmt='jsonl', batch_size=EXPORT_BATCH_SIZE, max_errors=100):
+    """
+    Импортирует записи из потока пачками по batch_size, каждая пачка - своя транзакция.
+    Невалидные записи пропускаются; если пачку отклонила база (нарушение ограничений),
+    она делится пополам и вставляется заново, так что пропускаются только плохие строки.
+    Возвращает статистику с пропускной способностью.
+    """
+    table = EXPORT_MODELS[table_name].__table__
+    started = perf_counter()
+    stats = {'table': table_name, 'imported': 0, 'skipped': 0, 'errors': []}
+
+    def report_error(line, message):
+        stats['skipped'] += 1
+        if len(stats['errors']) < max_errors:
+            stats['errors'].append({'line': line, 'error': message})
+
+    def flush(batch):
+        """batch - список пар (номер строки, строка)"""
+        try:
+            insert_import_batch(table_name, [row for _, row in batch])
+            stats['imported'] += len(batch)
+        except IntegrityError as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                report_error(batch[0][0], str(e.orig))
+                return
+            middle = len(batch) // 2
+            flush(batch[:middle])
+            flush(batch[middle:])
+
+    batch = []
+    for line, record in enumerate(read_records(stream, fmt), start=1):
+        try:
+            row = {column.name: convert_import_value(column, record[column.name])
+                   for column in table.columns if column.name in record}
+        except (ValueError, TypeError) as e:
+            report_error(line, str(e))
+            continue
+        # Файлы, где категория указана названием или slug, а не id
+        if table_name == 'articles' and row.get('category_id') is None and record.get('category'):
+            category = find_category(record['category'])
+            if category is None:
+                report_error(line, f'Категория не найдена: {record["category"]}')
+                continue
+            row['category_id'] = category['id']
+
+        errors = validate_import_record(table_name, row)
+        if errors:
+            report_error(line, '; '.join(errors.values()))
+            continue
+
+        if table_name == 'articles':
+            # Число комментариев пересчитывается при импорте самих комментариев
+            row['comment_count'] = 0
+            # HTML из файла не используется: он всегда рендерится из текста заново.
+            # Вычисленный анонс (excerpt_manual=false в выгрузке) тоже; без этого столбца анонс считается авторским
+            excerpt = row.get('excerpt') if row.get('excerpt_manual', True) else None
+            row.update(article_derived_fields(row['text'], excerpt))
+
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    stats['seconds'] = round(perf_counter() - started, 3)
+    stats['rows_per_second'] = round(stats['imported'] / stats['seconds']) if stats['seconds'] else 0
+    return stats
+
+
+# Выгрузка таблицы администратором (потоковая)
+@bp.route('/admin/export/<table_name>')
+@admin_required
+def admin_export(table_name):
+    fmt = request.args.get('format', 'jsonl')
+    if table_name not in EXPORT_MODELS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(stream_with_context(export_table(table_name, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={table_name}.{fmt}'
+    return response
+
+
+# Загрузка таблицы администратором: файл в поле file, формат - по ?format=
+@bp.route('/admin/import/<table_name>', methods=['POST'])
+@admin_required
+def admin_import(table_name):
+    fmt = request.args.get('format', 'jsonl')
+    upload = request.files.get('file')
+    if table_name not in EXPORT_MODELS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    if upload is None:
+        abort(400)
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+    return jsonify(import_table(table_name, stream, fmt))
+
+
+# Массовое удаление (модерация): один set-based DELETE на таблицу вместо загрузки строк в ORM
+def foreign_keys_enforced(connection):
+    if connection.dialect.name != 'sqlite':
+        return True
+    return bool(connection.exec_driver_sql('PRAGMA foreign_keys').scalar())
+
+
+def moderate_delete(user_id=None, category=None, date_from=None, date_to=None, delete_user=False):
+    """
+    Удаляет статьи по автору, категории (slug или название) и/или диапазону дат [date_from, date_to)
+    вместе с комментариями.
+    Если задан автор, удаляются и его комментарии к чужим статьям с теми же условиями: к статьям
+    категории и написанные в диапазоне дат. Без категории и дат (и при delete_user) - все его комментарии,
+    а при delete_user - и сам пользователь.
+    Возвращает число удаленных строк по таблицам.
+    """
+    conditions = []
+    if user_id is not None:
+        conditions.append(Article.user_id == user_id)
+    if category:
+        category_info = find_category(category)
+        if category_info is None:
+            raise ValueError(f'Категория не найдена: {category}')
+        conditions.append(Article.category_id == category_info['id'])
+    if date_from:
+        conditions.append(Article.created_date >= date_from)
+    if date_to:
+        conditions.append(Article.created_date < date_to)
+    if not conditions:
+        raise ValueError('Не задано ни одного условия удаления')
+    if delete_user and (user_id is None or len(conditions) > 1):
+        raise ValueError('Пользователя можно удалить только вместе со всеми его статьями')
+
+    connection = db.session.connection()
+    articles = Article.__table__
+    comments = Comment.__table__
+    deleted = {'articles': 0, 'comments': 0, 'users': 0}
+
+    # id, категории и даты нужны для сброса кэшей удаленных страниц и счетчиков категорий
+    affected = connection.execute(db.select(articles.c.id, articles.c.category_id, articles.c.created_date)
+                                  .where(*conditions)).all()
+    tags = {'articles'}
+    tags.update(f'article:{row.id}' for row in affected)
+    tags.update(f'comments:{row.id}' for row in affected)
+    category_deltas = {}
+    today_bounds = get_today_bounds()
+    for row in affected:
+        add_category_delta(category_deltas, row.category_id, -1, row.created_date, today_bounds)
+    if affected:
+        tags.update(category_cache_tags(connection, category_deltas))
+        tags.update(apply_category_deltas(connection, category_deltas))
+
+    if user_id is not None:
+        # Комментарии автора к чужим статьям с теми же условиями: уменьшаем счетчики этих статей
+        comment_conditions = [comments.c.user_id == user_id,
+                              comments.c.article_id.not_in(db.select(articles.c.id).where(*conditions))]
+        if category:
+            comment_conditions.append(comments.c.article_id.in_(
+                db.select(articles.c.id).where(articles.c.category_id == category_info['id'])))
+        if date_from:
+            comment_conditions.append(comments.c.date >= date_from)
+        if date_to:
+            comment_conditions.append(comments.c.date < date_to)
+        remaining = (db.select(comments.c.article_id, db.func.count().label('total'))
+                     .where(*comment_conditions).group_by(comments.c.article_id))
+        deltas = {row.article_id: -row.total for row in connection.execute(remaining)}
+        deleted['comments'] += connection.execute(comments.delete().where(*comment_conditions)).rowcount
+        if deltas:
+            tags.update(apply_comment_deltas(connection, deltas))
+
+    if not foreign_keys_enforced(connection):
+        deleted['comments'] += connection.execute(comments.delete().where(
+            comments.c.article_id.in_(db.select(articles.c.id).where(*conditions))
+        )).rowcount
+    else:
+        deleted['comments'] += connection.execute(
+            db.select(db.func.count()).select_from(comments).where(
+                comments.c.article_id.in_(db.select(articles.c.id).where(*conditions)))
+        ).scalar()
+
+    # Комментарии удаленных статей удаляются каскадом ON DELETE CASCADE
+    deleted['articles'] = connection.execute(articles.delete().where(*conditions)).rowcount
+
+    if delete_user and user_id is not None:
+        deleted['users'] = connection.execute(User.__table__.delete().where(User.__table__.c.id == user_id)).rowcount
+        db.session.info.setdefault('role_changes', set()).add(user_id)
+
+    bump_change_counters(connection, tags)
+    db.session.commit()
+    return deleted
+
+
+def parse_moderation_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Некорректная дата: {value}')
+
+
+# Массовое удаление статей администратором: по автору, категории и диапазону дат
+@bp.route('/admin/moderation/delete', methods=['POST'])
+@admin_required
+def admin_moderation_delete():
+    data = request.get_json(silent=True) or request.form
+    try:
+        deleted = moderate_delete(user_id=int(data['user_id']) if data.get('user_id') else None,
+                                  category=data.get('category') or None,
+                                  date_from=parse_moderation_date(data.get('date_from')),
+                                  date_to=parse_moderation_date(data.get('date_to')),
+                                  delete_user=str(data.get('delete_user', '')).lower() in ('1', 'true', 'on'))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify(error=str(e)), 400
+    return jsonify(deleted=deleted)
+
+
+# Сжатие ответов на лету (RESPONSE_COMPRESSION): gzip или brotli по Accept-Encoding, потоковые ответы - по частям
+@bp.after_app_request
+def compress_response(response):
+    if (not current_app.config['RESPONSE_COMPRESSION'] or request.method == 'HEAD'
+            or response.status_code != 200 or response.direct_passthrough or response.content_encoding
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or response.cache_control.no_transform):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings, available_encodings())
+    if encoding is None:
+        return response
+
+    min_size = current_app.config['COMPRESSION_MIN_SIZE']
+    if response.is_streamed:
+        # Порог проверяется по началу потока; короткий поток отдается целиком без сжатия
+        original = response.response
+        chunks = iter(response.iter_encoded())
+        head, finished = read_head(chunks, min_size)
+        if finished and len(head) < min_size:
+            response.set_data(head)
+            return response
+        response.response = compress_chunks(itertools.chain([head], chunks), encoding)
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.content_encoding = encoding
+    # ETag страницы относится к несжатому телу, у сжатого представления он слабый
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# Собранные статические файлы (flask assets-build): адреса с хешем, вечное кэширование и сжатые копии
+@bp.app_url_defaults
+def fingerprint_static_url(endpoint, values):
+    """url_for('static', filename='style.css') дает адрес собранного файла, если он есть в манифесте"""
+    if endpoint == 'static':
+        entry = current_app.extensions['asset_manifest'].get(values.get('filename'))
+        if entry is not None:
+            values['filename'] = entry['file']
+
+
+def serve_static(filename):
+    """
+    Заменяет стандартный обработчик /static/. Собранные файлы отдаются с Cache-Control: immutable
+    и, если клиент принимает, в виде заранее сжатой копии brotli или gzip; остальные - как обычно.
+    """
+    entry = current_app.extensions['asset_files'].get(filename)
+    if entry is None:
+        return current_app.send_static_file(filename)
+
+    encoding = choose_encoding(request.accept_encodings, entry['encodings'])
+    response = send_from_directory(current_app.static_folder,
+                                   filename + ENCODING_SUFFIXES[encoding] if encoding else filename,
+                                   mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                                   max_age=current_app.config['ASSET_MAX_AGE'])
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# Страницы, которые прогрев открывает сам: только чтение, без счетчиков просмотров
+WARMUP_PATHS = ['/', '/news', '/api/articles', '/feed.xml']
+
+
+def warm_up(app):
+    """
+    Подготавливает воркер до первого запроса: компилирует все шаблоны (байткод попадает
+    в общий кэш на диске), проверяет соединение с базой и запрашивает WARMUP_PATHS,
+    чтобы построить карту URL и скомпилировать частые SQL-запросы.
+    Соединения, открытые при прогреве, закрываются: сервер, загружающий приложение до fork,
+    иначе передал бы их всем воркерам.
+    Ошибки прогрева не мешают запуску - воркер просто стартует холодным.
+    """
+    started = perf_counter()
+    logger = logging.getLogger(__name__)
+    templates = app.jinja_env.list_templates()
+    for name in templates:
+        app.jinja_env.get_template(name)
+    try:
+        with app.app_context():
+            with db.engine.connect() as connection:
+                connection.execute(db.text('SELECT 1'))
+        client = app.test_client()
+        for path in WARMUP_PATHS:
+            client.get(path)
+    except Exception:
+        logger.exception('Прогрев не завершен')
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+    logger.info('Прогрев: шаблонов %d за %.3f с', len(templates), perf_counter() - started)
+
+
+@click.command('init-db')
+@click.option('--drop', is_flag=True, help='Удалить существующие таблицы перед созданием.')
+@with_appcontext
+def init_db_command(drop):
+    """Создает таблицы базы данных."""
+    init_db(drop=drop)
+    click.echo('✅ Таблицы успешно созданы')
+
+
+@click.command('migrate-db')
+@with_appcontext
+def migrate_db_command():
+    """Переводит существующую базу на текущую схему без потери данных."""
+    steps = migrate_db()
+    for step in steps:
+        click.echo(f'  {step}')
+    click.echo('✅ База переведена на текущую схему' if steps else '✅ Схема базы уже актуальна')
+
+
+@click.command('seed-demo')
+@with_appcontext
+def seed_demo_command():
+    """Заполняет базу демонстрационными пользователями, статьями и комментариями."""
+    seed_demo_data()
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex_command():
+    """Пересобирает полнотекстовый индекс статей."""
+    rebuild_search_index()
+    click.echo('✅ Поисковый индекс пересобран')
+
+
+@click.command('flush-views')
+@with_appcontext
+def flush_views_command():
+    """Записывает накопленные просмотры статей в базу."""
+    click.echo(f'✅ Записано просмотров: {flush_views()}')
+
+
+@click.command('categories-recount')
+@with_appcontext
+def categories_recount_command():
+    """Пересчитывает число статей в категориях (после записи в базу в обход приложения)."""
+    recount_categories()
+    for category in Category.query.order_by(Category.position, Category.id):
+        click.echo(f'{category.name}: {category.article_count} (сегодня {category.today_count})')
+    click.echo('✅ Счетчики категорий пересчитаны')
+
+
+@click.command('assets-build')
+@with_appcontext
+def assets_build_command():
+    """Собирает статические файлы: имена с хешем, сжатые копии и шрифты WOFF2."""
+    manifest = build_assets(current_app.static_folder)
+    for name, entry in sorted(manifest.items()):
+        variants = ', '.join(f'{encoding} {size}' for encoding, size in entry['encodings'].items())
+        click.echo(f'{name} -> {entry["file"]} ({entry["size"]} байт{"; " + variants if variants else ""})')
+    click.echo(f'✅ Собрано файлов: {len(manifest)}')
+
+
+@click.command('export')
+@click.argument('table_name', type=click.Choice(list(EXPORT_MODELS)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='jsonl')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Файл выгрузки (по умолчанию stdout).')
+@with_appcontext
+def export_command(table_name, fmt, output):
+    """Выгружает таблицу в JSONL или CSV."""
+    started = perf_counter()
+    rows = 0
+    for chunk in export_table(table_name, fmt):
+        output.write(chunk)
+        rows += chunk.count('\n')
+    if fmt == 'csv':
+        rows -= 1
+    seconds = perf_counter() - started
+    click.echo(f'✅ Выгружено строк: {rows} за {seconds:.2f} с ({rows / seconds if seconds else 0:.0f} строк/с)',
+               err=True)
+
+
+@click.command('import')
+@click.argument('table_name', type=click.Choice(list(EXPORT_MODELS)))
+@click.argument('input_file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='jsonl')
+@click.option('--batch-size', type=int, default=EXPORT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_command(table_name, input_file, fmt, batch_size):
+    """Загружает таблицу из JSONL или CSV пачками."""
+    stats = import_table(table_name, input_file, fmt, batch_size=batch_size)
+    for error in stats['errors']:
+        click.echo(f'❌ Строка {error["line"]}: {error["error"]}', err=True)
+    click.echo(f'✅ Загружено: {stats["imported"]}, пропущено: {stats["skipped"]}, '
+               f'{stats["seconds"]} с ({stats["rows_per_second"]} строк/с)')
+
+
+def create_app(config=None):
+    """
+    Фабрика приложения. Не обращается к базе данных (кроме прогрева, TEMPLATE_WARMUP):
+    таблицы создаются командой flask init-db, демо-данные - командой flask seed-demo.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+
+    # Режим работы: 'production' выключает перезагрузку шаблонов, включает кэш байткода и прогрев
+    app.config['APP_ENV'] = os.environ.get('APP_ENV', 'development')
+    production = app.config['APP_ENV'] == 'production'
+    # None - шаблоны перезагружаются только в режиме отладки (поведение Flask по умолчанию)
+    app.config['TEMPLATES_AUTO_RELOAD'] = False if production else None
+    # Каталог кэша скомпилированных шаблонов, общий для воркеров. None - кэш выключен
+    app.config['JINJA_BYTECODE_CACHE_DIR'] = os.environ.get(
+        'JINJA_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache') if production else None)
+    # Компилировать шаблоны и открыть соединение с базой при создании приложения
+    app.config['TEMPLATE_WARMUP'] = os.environ.get('TEMPLATE_WARMUP', '1' if production else '0') == '1'
+
+    # Конфигурация базы данных
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///news_blog.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # PRAGMA, применяемые к каждому новому соединению SQLite. Пустой словарь - настройки SQLite по умолчанию
+    app.config['SQLITE_PRAGMAS'] = dict(DEFAULT_SQLITE_PRAGMAS)
+
+    # Пул соединений для серверных СУБД (PostgreSQL, MySQL); для SQLite не используется
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+    # Кэш страниц: 'memory' - LRU в процессе, 'file' - каталог PAGE_CACHE_DIR, общий для воркеров, 'none' - выключен
+    app.config['PAGE_CACHE_BACKEND'] = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+    app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 60))
+    # Ограничения по числу записей и объему; файловый кэш проверяет их очисткой каталога раз в PAGE_CACHE_TTL
+    app.config['PAGE_CACHE_MAX_ENTRIES'] = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 1000))
+    app.config['PAGE_CACHE_MAX_BYTES'] = int(os.environ.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR', os.path.join(app.instance_path, 'page_cache'))
+
+    # Параметры хеширования паролей; старые хеши пересчитываются при следующем входе
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+    # Пул потоков для хеширования: число потоков, длина очереди и ожидание результата в секундах
+    app.config['KDF_MAX_WORKERS'] = int(os.environ.get('KDF_MAX_WORKERS', 2))
+    app.config['KDF_MAX_PENDING'] = int(os.environ.get('KDF_MAX_PENDING', 32))
+    app.config['KDF_TIMEOUT'] = float(os.environ.get('KDF_TIMEOUT', 10))
+    # Сколько секунд роль пользователя хранится в кэше проверок admin_required
+    app.config['ROLE_CACHE_TTL'] = float(os.environ.get('ROLE_CACHE_TTL', 30))
+
+    # Количество статей на одной странице списков и комментариев на одной странице статьи
+    app.config['ARTICLES_PER_PAGE'] = int(os.environ.get('ARTICLES_PER_PAGE', 20))
+    app.config['COMMENTS_PER_PAGE'] = int(os.environ.get('COMMENTS_PER_PAGE', 20))
+
+    # Счетчик просмотров: 'memory' - в процессе, 'file' - журнал в VIEW_COUNTER_DIR, общий для воркеров
+    # (например в /dev/shm), 'none' - просмотры не считаются
+    app.config['VIEW_COUNTER_BACKEND'] = os.environ.get('VIEW_COUNTER_BACKEND', 'memory')
+    app.config['VIEW_COUNTER_DIR'] = os.environ.get('VIEW_COUNTER_DIR', os.path.join(app.instance_path, 'views'))
+    # Раз в сколько секунд просмотры записываются в базу. 0 - только командой flask flush-views
+    app.config['VIEW_FLUSH_INTERVAL'] = float(os.environ.get('VIEW_FLUSH_INTERVAL', 10))
+    # Сколько последних статей попадает в ленты Atom
+    app.config['FEED_ARTICLES'] = int(os.environ.get('FEED_ARTICLES', 20))
+    # Сколько статей показывать в блоке "Популярное за неделю"
+    app.config['POPULAR_ARTICLES_LIMIT'] = int(os.environ.get('POPULAR_ARTICLES_LIMIT', 5))
+    # Раз в сколько секунд пересчитывается рейтинг популярных статей и обновляются страницы с ним
+    app.config['POPULAR_CACHE_TTL'] = int(os.environ.get('POPULAR_CACHE_TTL', 300))
+
+    # Запись комментариев: 'sync' - коммит в запросе, 'queue' - очередь с групповым коммитом в фоновом потоке
+    app.config['COMMENT_WRITE_MODE'] = os.environ.get('COMMENT_WRITE_MODE', 'sync')
+    # Размер очереди, после которого новые комментарии отклоняются с 503
+    app.config['COMMENT_QUEUE_MAX_PENDING'] = int(os.environ.get('COMMENT_QUEUE_MAX_PENDING', 1000))
+    # Пачка коммитится, когда набралось BATCH_SIZE комментариев или прошло MAX_DELAY секунд с первого
+    app.config['COMMENT_QUEUE_BATCH_SIZE'] = int(os.environ.get('COMMENT_QUEUE_BATCH_SIZE', 100))
+    app.config['COMMENT_QUEUE_MAX_DELAY'] = float(os.environ.get('COMMENT_QUEUE_MAX_DELAY', 0.005))
+    # Ждать ли коммита перед ответом (сохраненность как при синхронной записи) и сколько секунд
+    app.config['COMMENT_QUEUE_WAIT'] = os.environ.get('COMMENT_QUEUE_WAIT', '1') == '1'
+    app.config['COMMENT_QUEUE_TIMEOUT'] = float(os.environ.get('COMMENT_QUEUE_TIMEOUT', 5))
+
+    # Списки статей (главная, новости, категории) из каталога в памяти процесса вместо запросов к базе
+    app.config['ARTICLE_CATALOG'] = os.environ.get('ARTICLE_CATALOG', '0') == '1'
+
+    # Потоковый рендеринг страниц списков и статей: первые байты уходят до конца рендеринга,
+    # документ не собирается в памяти. Потоковые страницы не попадают в кэш страниц (ETag и 304 работают)
+    app.config['STREAM_TEMPLATES'] = os.environ.get('STREAM_TEMPLATES', '0') == '1'
+    # Размер частей потока в байтах
+    app.config['STREAM_CHUNK_SIZE'] = int(os.environ.get('STREAM_CHUNK_SIZE', 16 * 1024))
+    # Сжатие HTML, JSON и лент на лету (gzip/brotli по Accept-Encoding); ответы меньше порога в байтах не сжимаются
+    app.config['RESPONSE_COMPRESSION'] = os.environ.get('RESPONSE_COMPRESSION', '0') == '1'
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+    # Срок кэширования собранных статических файлов в секундах (их адрес меняется вместе с содержимым)
+    app.config['ASSET_MAX_AGE'] = int(os.environ.get('ASSET_MAX_AGE', 365 * 24 * 3600))
+
+    # Доля запросов (0..1), для которых собираются метрики времени. 0 - сбор выключен
+    app.config['METRICS_SAMPLE_RATE'] = float(os.environ.get('METRICS_SAMPLE_RATE', 0))
+    # Адреса через запятую, которым /metrics доступна без входа администратора
+    app.config['METRICS_ALLOWED_IPS'] = [address.strip() for address in
+                                         os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if address.strip()]
+
+    if config:
+        app.config.update(config)
+
+    # Журнал выбранных запросов пишется в stderr, если у логгера нет своих обработчиков
+    if app.config['METRICS_SAMPLE_RATE'] and not metrics_logger.handlers:
+        metrics_logger.addHandler(logging.StreamHandler())
+        metrics_logger.setLevel(logging.INFO)
+
+    # Окружение Jinja создается при первом обращении, поэтому кэш байткода задается до него
+    if app.config['JINJA_BYTECODE_CACHE_DIR']:
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])}
+
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_recycle': app.config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        })
+
+    if app.config['PAGE_CACHE_BACKEND'] == 'memory':
+        app.extensions['page_cache'] = MemoryPageCache(ttl=app.config['PAGE_CACHE_TTL'],
+                                                       max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'],
+                                                       max_bytes=app.config['PAGE_CACHE_MAX_BYTES'])
+    elif app.config['PAGE_CACHE_BACKEND'] == 'file':
+        app.extensions['page_cache'] = FilePageCache(app.config['PAGE_CACHE_DIR'], ttl=app.config['PAGE_CACHE_TTL'],
+                                                     max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'],
+                                                     max_bytes=app.config['PAGE_CACHE_MAX_BYTES'])
+
+    app.extensions['kdf_pool'] = KdfPool(max_workers=app.config['KDF_MAX_WORKERS'],
+                                         max_pending=app.config['KDF_MAX_PENDING'],
+                                         timeout=app.config['KDF_TIMEOUT'])
+    app.extensions['role_cache'] = {}
+
+    if app.config['VIEW_COUNTER_BACKEND'] == 'memory':
+        app.extensions['view_counter'] = MemoryViewCounter()
+    elif app.config['VIEW_COUNTER_BACKEND'] == 'file':
+        app.extensions['view_counter'] = FileViewCounter(app.config['VIEW_COUNTER_DIR'])
+    app.extensions['popular_cache'] = {}
+    app.extensions['category_cache'] = {}
+    if app.config['ARTICLE_CATALOG']:
+        # Загружается при первом запросе списка
+        app.extensions['article_catalog'] = ArticleCatalog()
+
+    if app.config['COMMENT_WRITE_MODE'] == 'queue':
+        comment_queue = GroupCommitQueue(partial(write_comment_batch, app),
+                                         max_pending=app.config['COMMENT_QUEUE_MAX_PENDING'],
+                                         batch_size=app.config['COMMENT_QUEUE_BATCH_SIZE'],
+                                         max_delay=app.config['COMMENT_QUEUE_MAX_DELAY'])
+        app.extensions['comment_queue'] = comment_queue
+        # Поток записи запускается первым комментарием процесса, поэтому очередь работает и в воркерах после fork.
+        # При остановке процесса очередь дописывается в базу
+        atexit.register(comment_queue.close)
+
+    # Манифест flask assets-build; без сборки статические файлы отдаются как обычно
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.extensions['asset_files'] = {entry['file']: entry for entry in app.extensions['asset_manifest'].values()}
+    app.view_functions['static'] = serve_static
+
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+    app.cli.add_command(seed_demo_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(flush_views_command)
+    app.cli.add_command(categories_recount_command)
+    app.cli.add_command(assets_build_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
+
+    if app.config['TEMPLATE_WARMUP']:
+        warm_up(app)
+    return app
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    with app.app_context():
+        init_db()
+    app.run(debug=app.config['APP_ENV'] != 'production')
@@ -0,0 +1,142 @@
+"""
+Хранилища для кэша отрендеренных страниц.
+
+Инвалидация построена на версиях тегов: ключ страницы включает текущие версии
+всех её тегов из таблицы change_counters (например 'articles', 'category:moda', 'article:5'),
+поэтому изменение данных делает старые записи недостижимыми, и они вытесняются по LRU/TTL
+(в файловом кэше - периодической очисткой каталога).
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryPageCache:
+    """LRU-кэш в памяти процесса с ограничением по TTL, числу записей и объёму"""
+
+    def __init__(self, ttl=60, max_entries=1000, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, size = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class FilePageCache:
+    """
+    Кэш в каталоге на диске, общий для нескольких процессов-воркеров.
+    Для хранения в разделяемой памяти достаточно указать каталог в /dev/shm.
+
+    Записи старых версий тегов больше никто не читает, поэтому не реже раза в sweep_interval
+    секунд запись в кэш просматривает каталог: удаляет файлы старше TTL, а если файлов
+    больше max_entries или они занимают больше max_bytes - самые старые.
+    """
+
+    TMP_PREFIX = '.tmp'
+
+    def __init__(self, directory, ttl=60, max_entries=1000, max_bytes=32 * 1024 * 1024, sweep_interval=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = ttl if sweep_interval is None else sweep_interval
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _page_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=self.TMP_PREFIX)
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        path = self._page_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, 'rb') as page_file:
+                return pickle.load(page_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, value, size):
+        self._write_atomic(self._page_path(key), pickle.dumps(value))
+        if time.monotonic() >= self._next_sweep and self._sweep_lock.acquire(blocking=False):
+            try:
+                self._next_sweep = time.monotonic() + self.sweep_interval
+                self.sweep()
+            finally:
+                self._sweep_lock.release()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            # Файл уже удалил другой воркер
+            pass
+
+    def sweep(self):
+        """Удаляет просроченные файлы и самые старые сверх ограничений по числу и объему"""
+        now = time.time()
+        pages = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if stat.st_mtime + self.ttl < now:
+                    # И недописанные временные файлы упавших воркеров
+                    self._remove(entry.path)
+                elif not entry.name.startswith(self.TMP_PREFIX):
+                    pages.append((stat.st_mtime, stat.st_size, entry.path))
+        pages.sort()
+        total = sum(size for _, size, _ in pages)
+        for index, (_, size, path) in enumerate(pages):
+            if len(pages) - index <= self.max_entries and total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            self._remove(os.path.join(self.directory, name))
@@ -0,0 +1,154 @@
+"""
+Запись комментариев через очередь с групповым коммитом (COMMENT_WRITE_MODE='queue'):
+пачки по числу и по времени, id из Future, отказ при переполнении, дозапись при close()
+и работа очереди в воркерах, созданных fork после создания приложения.
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, init_db, db, User, Article, Comment, Category  # noqa: E402
+from write_queue import GroupCommitQueue, WriteQueueFull  # noqa: E402
+
+COMMENT_FORM = {'author_name': 'Гость', 'text': 'Отличная статья, спасибо!'}
+
+
+class RecordingWriter:
+    """write_batch, запоминающий пачки; пока gate не открыт, запись ждет"""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, items):
+        self.started.set()
+        self.gate.wait()
+        self.batches.append(list(items))
+        return [item * 10 for item in items]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'none', 'VIEW_COUNTER_BACKEND': 'none',
+                      'COMMENT_WRITE_MODE': 'queue'})
+    with app.app_context():
+        init_db()
+        category_id = db.session.execute(db.select(Category.id).filter_by(slug='raznoe')).scalar_one()
+        author = User(name='Автор', email='author@meowblog.ru', hashed_password='-')
+        db.session.add(Article(title='Статья', text='Текст статьи', category_id=category_id, author=author))
+        db.session.commit()
+        app.config['TEST_ARTICLE_ID'] = db.session.execute(db.select(Article.id)).scalar_one()
+    yield app
+    app.extensions['comment_queue'].close()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def comment_count(app):
+    with app.app_context():
+        return db.session.query(Comment).count()
+
+
+def test_batch_is_written_when_batch_size_is_reached():
+    writer = RecordingWriter()
+    # Пачка уходит, как только набралось batch_size записей, не дожидаясь max_delay
+    write_queue = GroupCommitQueue(writer, batch_size=2, max_delay=10)
+    futures = [write_queue.submit(item) for item in (1, 2, 3, 4)]
+    assert [future.result(timeout=1) for future in futures] == [10, 20, 30, 40]
+    assert writer.batches == [[1, 2], [3, 4]]
+    write_queue.close()
+
+
+def test_batch_is_written_after_max_delay():
+    writer = RecordingWriter()
+    write_queue = GroupCommitQueue(writer, batch_size=100, max_delay=0.2)
+    started = time.monotonic()
+    futures = [write_queue.submit(item) for item in (1, 2)]
+    assert [future.result(timeout=1) for future in futures] == [10, 20]
+    assert time.monotonic() - started >= 0.15
+    assert writer.batches == [[1, 2]]
+    write_queue.close()
+
+
+def test_full_queue_rejects_writes():
+    writer = RecordingWriter()
+    writer.gate.clear()
+    write_queue = GroupCommitQueue(writer, max_pending=1, batch_size=1)
+    write_queue.submit(1)
+    writer.started.wait(1)
+    write_queue.submit(2)
+    with pytest.raises(WriteQueueFull):
+        write_queue.submit(3)
+    writer.gate.set()
+    write_queue.close()
+    assert writer.batches == [[1], [2]]
+
+
+def test_close_writes_pending_items():
+    writer = RecordingWriter()
+    write_queue = GroupCommitQueue(writer, batch_size=100, max_delay=10)
+    futures = [write_queue.submit(item) for item in (1, 2, 3)]
+    write_queue.close()
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [10, 20, 30]
+    with pytest.raises(WriteQueueFull):
+        write_queue.submit(4)
+
+
+def test_future_returns_comment_id(app):
+    article_id = app.config['TEST_ARTICLE_ID']
+    future = app.extensions['comment_queue'].submit({'text': 'Комментарий', 'author_name': 'Гость',
+                                                     'article_id': article_id, 'user_id': None})
+    comment_id = future.result(timeout=5)
+    with app.app_context():
+        assert db.session.get(Comment, comment_id).article_id == article_id
+
+
+def test_comment_is_written_before_redirect(app):
+    article_id = app.config['TEST_ARTICLE_ID']
+    response = app.test_client().post(f'/news/{article_id}', data=COMMENT_FORM)
+    assert response.status_code == 302
+    assert comment_count(app) == 1
+    with app.app_context():
+        assert db.session.get(Article, article_id).comment_count == 1
+
+
+def test_comment_is_rejected_when_queue_does_not_accept_writes(app):
+    app.extensions['comment_queue'].close()
+    response = app.test_client().post(f'/news/{app.config["TEST_ARTICLE_ID"]}', data=COMMENT_FORM)
+    assert response.status_code == 503
+    assert comment_count(app) == 0
+
+
+def test_comment_to_missing_article_is_404(app):
+    response = app.test_client().post('/news/999', data=COMMENT_FORM)
+    assert response.status_code == 404
+    assert comment_count(app) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='нужен os.fork')
+def test_queue_works_in_forked_worker(app):
+    """Приложение создано до fork, как при preload у pre-fork серверов"""
+    article_id = app.config['TEST_ARTICLE_ID']
+    app.test_client().post(f'/news/{article_id}', data=COMMENT_FORM)
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            with app.app_context():
+                db.engine.dispose(close=False)
+            response = app.test_client().post(f'/news/{article_id}', data=COMMENT_FORM)
+            status = 0 if response.status_code == 302 else 2
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert comment_count(app) == 2
@@ -0,0 +1,55 @@
+"""
+Сводка метрик /metrics доступна только администратору и адресам из METRICS_ALLOWED_IPS.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, init_db, db, User  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'none', 'VIEW_COUNTER_BACKEND': 'none'})
+    with app.app_context():
+        init_db()
+        users = [User(name='Читатель', email='reader@meowblog.ru', hashed_password='-'),
+                 User(name='Админ', email='admin@meowblog.ru', hashed_password='-', is_admin=True)]
+        db.session.add_all(users)
+        db.session.commit()
+        app.config['TEST_USER_IDS'] = {'reader': users[0].id, 'admin': users[1].id}
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def login_as(client, user_id):
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+        flask_session['user_name'] = 'Пользователь'
+
+
+def test_metrics_are_hidden_from_anonymous_and_regular_users(app):
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 403
+    login_as(client, app.config['TEST_USER_IDS']['reader'])
+    assert client.get('/metrics').status_code == 403
+
+
+def test_metrics_are_available_to_admin(app):
+    client = app.test_client()
+    login_as(client, app.config['TEST_USER_IDS']['admin'])
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert 'endpoints' in response.get_json()
+
+
+def test_metrics_are_available_to_allowed_address(app):
+    app.config['METRICS_ALLOWED_IPS'] = ['10.0.0.5']
+    client = app.test_client()
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.6'}).status_code == 403
@@ -0,0 +1,133 @@
+"""
+flask migrate-db на базе исходной схемы (категория - строка в articles, без счетчиков, FTS и каскадов):
+данные сохраняются, категории, счетчики и поисковый индекс строятся заново, повторный запуск ничего не меняет.
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, search_articles, make_excerpt, db, Article, Comment, Category  # noqa: E402
+
+# Схема базы до перевода категорий в справочник, счетчиков и полнотекстового поиска
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    hashed_password VARCHAR(200) NOT NULL,
+    created_date DATETIME,
+    is_admin BOOLEAN,
+    PRIMARY KEY (id),
+    UNIQUE (email)
+);
+CREATE TABLE articles (
+    id INTEGER NOT NULL,
+    title VARCHAR(200) NOT NULL,
+    text TEXT NOT NULL,
+    created_date DATETIME,
+    category VARCHAR(50) NOT NULL,
+    excerpt TEXT,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE comments (
+    id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    date DATETIME,
+    author_name VARCHAR(100) NOT NULL,
+    article_id INTEGER NOT NULL,
+    user_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(article_id) REFERENCES articles (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+"""
+CATS_TEXT = 'Коты спят по шестнадцать часов в сутки, а остальное время наблюдают за хозяевами.'
+FASHION_TEXT = 'Осенью в моде объемные свитера, широкие брюки и ботинки на толстой подошве.'
+ARTICLES = [
+    (1, 'Про котиков', CATS_TEXT, '2024-01-01 10:00:00', 'Котики', make_excerpt(CATS_TEXT), 1),
+    (2, 'Осенняя мода', FASHION_TEXT, '2024-01-02 10:00:00', 'Мода', 'Анонс, написанный автором', 2),
+    (3, 'Без категории', 'Короткая заметка без категории.', '2024-01-03 10:00:00', '', None, 1),
+]
+COMMENTS = [
+    (1, 'Мой кот тоже всё время спит', '2024-01-01 11:00:00', 'Гость', 1, None),
+    (2, 'Полностью согласна', '2024-01-01 12:00:00', 'Мария', 1, 2),
+    (3, 'А где купить такие ботинки?', '2024-01-02 11:00:00', 'Гость', 2, None),
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)', [
+        (1, 'Автор', 'author@meowblog.ru', '-', '2024-01-01 09:00:00', 0),
+        (2, 'Мария', 'maria@meowblog.ru', '-', '2024-01-01 09:00:00', 1),
+    ])
+    connection.executemany('INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)', ARTICLES)
+    connection.executemany('INSERT INTO comments VALUES (?, ?, ?, ?, ?, ?)', COMMENTS)
+    connection.commit()
+    connection.close()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'none', 'VIEW_COUNTER_BACKEND': 'none'})
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def dump(app):
+    """Содержимое таблиц с данными пользователей для сравнения до и после повторного запуска"""
+    with app.app_context():
+        return {table: db.session.execute(db.text(f'SELECT * FROM {table} ORDER BY 1')).all()
+                for table in ('users', 'categories', 'articles', 'comments')}
+
+
+def test_migrate_db_keeps_data_and_is_idempotent(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['migrate-db'])
+    assert result.exit_code == 0, result.output
+    assert 'Создана категория Котики' in result.output
+    assert '✅ База переведена на текущую схему' in result.output
+
+    with app.app_context():
+        articles = {article.id: article for article in db.session.execute(db.select(Article)).scalars()}
+        assert {article_id: (article.title, article.text, article.user_id, article.category.name)
+                for article_id, article in articles.items()} == {
+            1: ('Про котиков', CATS_TEXT, 1, 'Котики'),
+            2: ('Осенняя мода', FASHION_TEXT, 2, 'Мода'),
+            3: ('Без категории', 'Короткая заметка без категории.', 1, 'Разное'),
+        }
+        assert articles[1].category.slug == 'kotiki'
+        assert {article_id: article.comment_count for article_id, article in articles.items()} == {1: 2, 2: 1, 3: 0}
+        # Анонс, совпадающий со сгенерированным, снова следит за текстом; написанный автором - сохраняется
+        assert (articles[1].excerpt_manual, articles[2].excerpt_manual, articles[3].excerpt_manual) == (
+            False, True, False)
+        assert articles[2].excerpt == 'Анонс, написанный автором'
+        assert articles[3].excerpt == make_excerpt('Короткая заметка без категории.')
+        assert all(article.html and article.word_count for article in articles.values())
+        counts = dict(db.session.execute(db.select(Category.slug, Category.article_count)).all())
+        assert (counts['kotiki'], counts['moda'], counts['raznoe']) == (1, 1, 1)
+
+    with app.test_request_context():
+        assert [result['id'] for result in search_articles('котиков')['results']] == [1]
+        assert [result['id'] for result in search_articles('ботинки')['results']] == [2]
+
+    migrated = dump(app)
+    result = runner.invoke(args=['migrate-db'])
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == '✅ Схема базы уже актуальна'
+    assert dump(app) == migrated
+
+    # После перестройки таблиц комментарии удаляются вместе со статьей (ON DELETE CASCADE)
+    with app.app_context():
+        db.session.delete(db.session.get(Article, 1))
+        db.session.commit()
+        assert db.session.query(Comment).count() == 1
+        assert db.session.execute(db.text('SELECT count(*) FROM comments_fts')).scalar() == 1
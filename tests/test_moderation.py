@@ -0,0 +1,99 @@
+"""
+Удаление статей: массовое удаление по автору с категорией и датами не трогает остальные
+комментарии автора, а удаление статьи без PRAGMA foreign_keys не оставляет осиротевших комментариев.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, init_db, moderate_delete, db, User, Article, Comment, Category  # noqa: E402
+
+OLD = datetime(2024, 1, 10, 12, 0)
+NEW = datetime(2024, 3, 10, 12, 0)
+
+
+def make_app(tmp_path, **config):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'none', 'VIEW_COUNTER_BACKEND': 'none', **config})
+    with app.app_context():
+        init_db()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def add_article(author, slug, created_date, comments=()):
+    category_id = db.session.execute(db.select(Category.id).filter_by(slug=slug)).scalar_one()
+    article = Article(title=f'Статья {slug}', text='Текст статьи', category_id=category_id, author=author,
+                      created_date=created_date)
+    for commenter, comment_date in comments:
+        article.comments.append(Comment(text='Комментарий модератору', author_name=commenter.name,
+                                        user=commenter, date=comment_date))
+    db.session.add(article)
+    return article
+
+
+def test_narrow_moderation_keeps_other_comments_of_user(app):
+    with app.app_context():
+        spammer = User(name='Спамер', email='spam@meowblog.ru', hashed_password='-')
+        other = User(name='Автор', email='author@meowblog.ru', hashed_password='-')
+        add_article(spammer, 'moda', NEW)
+        add_article(spammer, 'raznoe', NEW)
+        # Чужие статьи: комментарий в категории и в диапазоне, вне категории и вне диапазона
+        target = add_article(other, 'moda', OLD, [(spammer, NEW), (spammer, OLD)])
+        kept = add_article(other, 'raznoe', OLD, [(spammer, NEW)])
+        db.session.commit()
+        target_id, kept_id = target.id, kept.id
+
+        deleted = moderate_delete(user_id=spammer.id, category='moda', date_from=datetime(2024, 3, 1))
+        assert deleted == {'articles': 1, 'comments': 1, 'users': 0}
+        db.session.expire_all()
+        assert db.session.query(Article).filter_by(user_id=spammer.id).count() == 1
+        assert db.session.get(Article, target_id).comment_count == 1
+        assert db.session.get(Article, kept_id).comment_count == 1
+        assert db.session.query(Comment).filter_by(user_id=spammer.id).count() == 2
+
+
+def test_moderation_by_author_only_deletes_all_comments_of_user(app):
+    with app.app_context():
+        spammer = User(name='Спамер', email='spam@meowblog.ru', hashed_password='-')
+        other = User(name='Автор', email='author@meowblog.ru', hashed_password='-')
+        add_article(spammer, 'moda', NEW)
+        add_article(other, 'raznoe', OLD, [(spammer, NEW), (spammer, OLD)])
+        db.session.commit()
+
+        deleted = moderate_delete(user_id=spammer.id, delete_user=True)
+        assert deleted == {'articles': 1, 'comments': 2, 'users': 1}
+        assert db.session.query(Comment).count() == 0
+
+
+def test_delete_article_without_foreign_keys_removes_comments(tmp_path):
+    app = make_app(tmp_path, SQLITE_PRAGMAS={})
+    with app.app_context():
+        author = User(name='Автор', email='author@meowblog.ru', hashed_password='-')
+        article = add_article(author, 'moda', NEW, [(author, NEW), (author, NEW)])
+        db.session.commit()
+        article_id, user_id = article.id, author.id
+        assert not db.session.execute(db.text('PRAGMA foreign_keys')).scalar()
+
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+        flask_session['user_name'] = 'Автор'
+    assert client.get(f'/delete-article/{article_id}').status_code == 302
+
+    with app.app_context():
+        assert db.session.get(Article, article_id) is None
+        assert db.session.query(Comment).count() == 0
+        assert db.session.execute(db.text('SELECT count(*) FROM comments_fts')).scalar() == 0
+        db.engine.dispose()
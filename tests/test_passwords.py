@@ -0,0 +1,19 @@
+"""
+Проверка необходимости пересчета хеша пароля: сокращенная запись метода в настройках
+совпадает с полной записью, которую werkzeug сохраняет в хеше.
+"""
+import os
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import password_hash_prefix  # noqa: E402
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'scrypt:32768:8:1', 'scrypt:16384:8:1',
+                                    'pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha512', 'pbkdf2:sha256:600000'])
+def test_prefix_matches_werkzeug(method):
+    assert password_hash_prefix(method) == generate_password_hash('', method=method).split('$', 1)[0]
@@ -0,0 +1,61 @@
+"""
+Число SQL-запросов страниц списков не должно зависеть от числа статей на странице:
+рост с числом статей означает возврат N+1 (например, автор загружается отдельным запросом).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, init_db, db, User, Article, Category  # noqa: E402
+
+SMALL = 5
+LARGE = 10 * SMALL
+LIST_PATHS = ['/news', '/category/raznoe']
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'none', 'VIEW_COUNTER_BACKEND': 'none',
+                      # Все статьи на одной странице, чтобы каждая попала в рендеринг
+                      'ARTICLES_PER_PAGE': LARGE})
+    with app.app_context():
+        init_db()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def add_articles(app, count):
+    """Статьи разных авторов: общий автор загрузился бы один раз и скрыл бы N+1"""
+    with app.app_context():
+        category_id = db.session.execute(db.select(Category.id).filter_by(slug='raznoe')).scalar_one()
+        start = db.session.query(Article).count()
+        for i in range(start, start + count):
+            author = User(name=f'Автор {i}', email=f'author{i}@meowblog.ru', hashed_password='-')
+            db.session.add(Article(title=f'Статья {i}', text=f'Текст статьи {i}', category_id=category_id,
+                                   author=author))
+        db.session.commit()
+
+
+def query_counts(client):
+    """Запросов на страницу после первого запроса, который заполняет кэши процесса (популярное, категории)"""
+    counts = {}
+    for path in LIST_PATHS:
+        client.get(path)
+        response = client.get(path)
+        assert response.status_code == 200
+        counts[path] = int(response.headers['X-Query-Count'])
+    return counts
+
+
+def test_list_query_count_does_not_grow_with_articles(app):
+    client = app.test_client()
+    add_articles(app, SMALL)
+    small = query_counts(client)
+    add_articles(app, LARGE - SMALL)
+    large = query_counts(client)
+    assert large == small
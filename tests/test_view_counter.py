@@ -0,0 +1,116 @@
+"""
+Просмотры с отложенной записью: счетчики возвращаются при неудачной выгрузке, просмотры удаленных
+статей отбрасываются, рейтинг берет последние POPULAR_DAYS дней, а выгрузка не сбрасывает кэш страниц.
+"""
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import (create_app, init_db, flush_views, get_popular_articles, get_local_datetime, db,  # noqa: E402
+                  User, Article, ArticleViewDay, Category, POPULAR_DAYS)
+from view_counter import MemoryViewCounter, FileViewCounter  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'), 'TESTING': True,
+                      'PAGE_CACHE_BACKEND': 'memory', 'VIEW_COUNTER_BACKEND': 'memory',
+                      'VIEW_FLUSH_INTERVAL': 0})
+    with app.app_context():
+        init_db()
+        category_id = db.session.execute(db.select(Category.id).filter_by(slug='raznoe')).scalar_one()
+        author = User(name='Автор', email='author@meowblog.ru', hashed_password='-')
+        db.session.add_all([Article(title=f'Статья {i}', text='Текст статьи', category_id=category_id,
+                                    author=author) for i in range(2)])
+        db.session.commit()
+        app.config['TEST_ARTICLE_IDS'] = list(db.session.execute(db.select(Article.id).order_by(Article.id))
+                                              .scalars())
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def article_views(app):
+    with app.app_context():
+        return dict(db.session.execute(db.select(Article.id, Article.views)).all())
+
+
+@pytest.mark.parametrize('make_counter', [lambda tmp_path: MemoryViewCounter(),
+                                          lambda tmp_path: FileViewCounter(str(tmp_path / 'views'))])
+def test_restore_returns_drained_views(tmp_path, make_counter):
+    counter = make_counter(tmp_path)
+    counter.add(1)
+    counter.add(1)
+    counter.add(2, 3)
+    counts = counter.drain()
+    assert counts == {1: 2, 2: 3}
+    assert counter.drain() == {}
+    counter.restore(counts)
+    counter.add(1)
+    assert counter.drain() == {1: 3, 2: 3}
+
+
+def test_failed_flush_keeps_views(app, monkeypatch):
+    first, second = app.config['TEST_ARTICLE_IDS']
+    counter = app.extensions['view_counter']
+    counter.add(first, 2)
+    counter.add(second)
+
+    def fail():
+        raise RuntimeError('база недоступна')
+
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'commit', fail)
+        assert flush_views() == 0
+        monkeypatch.undo()
+        assert article_views(app) == {first: 0, second: 0}
+        assert flush_views() == 3
+    assert article_views(app) == {first: 2, second: 1}
+
+
+def test_views_of_deleted_articles_are_dropped(app):
+    first, second = app.config['TEST_ARTICLE_IDS']
+    counter = app.extensions['view_counter']
+    counter.add(first)
+    counter.add(second, 2)
+    with app.app_context():
+        db.session.delete(db.session.get(Article, second))
+        db.session.commit()
+        assert flush_views() == 1
+        assert db.session.query(ArticleViewDay).filter_by(article_id=second).count() == 0
+    assert counter.drain() == {}
+    assert article_views(app) == {first: 1}
+
+
+def test_popular_week_excludes_day_seven(app):
+    first, second = app.config['TEST_ARTICLE_IDS']
+    today = get_local_datetime().date()
+    with app.app_context():
+        db.session.add_all([
+            ArticleViewDay(article_id=first, day=today - timedelta(days=POPULAR_DAYS - 1), views=5),
+            ArticleViewDay(article_id=second, day=today - timedelta(days=POPULAR_DAYS), views=100),
+        ])
+        db.session.commit()
+    with app.test_request_context():
+        assert [(article['id'], article['views']) for article in get_popular_articles()] == [(first, 5)]
+    # Выгрузка удаляет дни, которые уже не входят в неделю
+    app.extensions['view_counter'].add(first)
+    with app.app_context():
+        flush_views()
+        assert db.session.query(ArticleViewDay).filter_by(article_id=second).count() == 0
+
+
+def test_flush_does_not_invalidate_pages(app):
+    client = app.test_client()
+    etags = [client.get(path).headers['ETag'] for path in ('/', '/category/raznoe')]
+    client.get(f'/news/{app.config["TEST_ARTICLE_IDS"][0]}')
+    with app.app_context():
+        assert flush_views() == 1
+    for path, etag in zip(('/', '/category/raznoe'), etags):
+        response = client.get(path)
+        assert response.headers['ETag'] == etag
+        assert response.headers['X-Page-Cache'] == 'HIT'
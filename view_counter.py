@@ -0,0 +1,113 @@
+"""
+Счётчики просмотров статей с отложенной записью (write-behind).
+
+Просмотр не пишет в базу: он увеличивает счётчик в памяти процесса или дописывает
+строку в общий файл, а периодическая выгрузка забирает накопленные счётчики (drain)
+и записывает их в базу одной транзакцией. Если запись не удалась, счётчики
+возвращаются обратно (restore) и попадут в следующую выгрузку.
+"""
+import os
+import threading
+from collections import Counter
+
+
+class MemoryViewCounter:
+    """Счётчики в памяти процесса; каждый воркер выгружает свои"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, article_id, count=1):
+        with self._lock:
+            self._counts[article_id] += count
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+    def restore(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+
+class FileViewCounter:
+    """
+    Общий для нескольких процессов-воркеров журнал просмотров в каталоге на диске
+    (например в /dev/shm). Просмотр - одна строка, дописанная в файл под разделяемой
+    блокировкой; выгрузка атомарно переименовывает файл и читает его под исключительной
+    блокировкой, дождавшись воркеров, которые ещё пишут в старый файл.
+    Нужен fcntl (POSIX); модуль импортируется здесь, чтобы остальные счётчики работали и без него.
+    """
+
+    def __init__(self, directory):
+        import fcntl
+        self._fcntl = fcntl
+        self.directory = directory
+        self.path = os.path.join(directory, 'views.log')
+        os.makedirs(directory, exist_ok=True)
+
+    def _append(self, data):
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                self._fcntl.flock(fd, self._fcntl.LOCK_SH)
+                # Файл могли забрать на выгрузку, пока мы ждали блокировку - пишем в новый
+                try:
+                    if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                os.write(fd, data)
+                return
+            finally:
+                os.close(fd)
+
+    def add(self, article_id, count=1):
+        self._append(f'{article_id} {count}\n'.encode('ascii'))
+
+    def drain(self):
+        draining_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}'
+        try:
+            os.replace(self.path, draining_path)
+        except FileNotFoundError:
+            return {}
+        counts = Counter()
+        with open(draining_path, 'rb') as log_file:
+            self._fcntl.flock(log_file, self._fcntl.LOCK_EX)
+            for line in log_file:
+                try:
+                    article_id, count = line.split()
+                    counts[int(article_id)] += int(count)
+                except ValueError:
+                    continue
+        os.remove(draining_path)
+        return dict(counts)
+
+    def restore(self, counts):
+        if counts:
+            self._append(''.join(f'{article_id} {count}\n' for article_id, count in counts.items()).encode('ascii'))
+
+
+class PeriodicFlusher:
+    """Фоновый поток, вызывающий flush раз в interval секунд; stop() делает последнюю выгрузку"""
+
+    def __init__(self, flush, interval):
+        self._flush = flush
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='view-flusher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._flush()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._flush()
@@ -0,0 +1,143 @@
+"""
+Очередь небольших записей с групповым коммитом (group commit).
+
+Запросы кладут подготовленные записи в ограниченную очередь и получают Future.
+Фоновый поток забирает записи пачками - до batch_size штук или сколько накопилось
+за max_delay секунд после первой - и записывает каждую пачку одной транзакцией:
+одна блокировка записи и один fsync на пачку вместо одного на запись.
+
+Долговечность: результат Future (например id комментария) появляется только после
+коммита пачки. Кто дождался результата, может считать запись сохраненной; записи,
+которые еще в очереди, теряются при аварийном завершении процесса. close() перестает
+принимать записи и дописывает всё, что уже в очереди.
+
+Поток записи запускается при первой записи в процессе, а не при создании очереди:
+потоки не переживают os.fork, и очередь, созданная до fork (preload у pre-fork серверов),
+запускает в каждом воркере свой поток с пустой очередью.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueueFull(Exception):
+    """Очередь заполнена или закрыта - запись не принята"""
+
+
+# Блокировка запуска потоков записи; после fork создается заново, так как ее мог держать поток родителя
+start_lock = threading.Lock()
+
+
+def reset_start_lock():
+    global start_lock
+    start_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_start_lock)
+
+
+class GroupCommitQueue:
+    def __init__(self, write_batch, max_pending=1000, batch_size=100, max_delay=0.005):
+        """
+        write_batch(items) записывает пачку одной транзакцией и возвращает список
+        результатов в том же порядке; исключение означает, что пачка не записана.
+        """
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = None
+        # Процесс, в котором запущен поток записи; None - поток еще не запускался
+        self._pid = None
+
+    def _start(self):
+        """Запускает поток записи в текущем процессе (при первой записи и первой записи после fork)"""
+        with start_lock:
+            pid = os.getpid()
+            if self._pid == pid or self._closed:
+                return
+            if self._pid is not None:
+                # Копия после fork: записи, оставшиеся в очереди родителя, допишет сам родитель
+                self._queue = queue.Queue(maxsize=self.max_pending)
+                self._close_lock = threading.Lock()
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def submit(self, item):
+        """Ставит запись в очередь без ожидания; при переполнении - WriteQueueFull (backpressure)"""
+        if self._pid != os.getpid():
+            self._start()
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise WriteQueueFull()
+            try:
+                self._queue.put_nowait((item, future))
+            except queue.Full:
+                raise WriteQueueFull()
+        return future
+
+    def _collect(self):
+        """Первая запись ждется без ограничения, остальные - не дольше max_delay"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # None - признак закрытия: он кладется последним, после него записей нет
+            stop = batch[-1] is None
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                self._write(entries)
+            if stop:
+                return
+
+    def _write(self, entries):
+        # Записи, Future которых уже отменен, не пишутся
+        entries = [(item, future) for item, future in entries if future.set_running_or_notify_cancel()]
+        if not entries:
+            return
+        items = [item for item, _ in entries]
+        futures = [future for _, future in entries]
+        try:
+            results = self.write_batch(items)
+        except Exception as e:
+            if len(items) == 1:
+                futures[0].set_exception(e)
+                return
+            # Пачка откатилась целиком - пишем по одной, чтобы ошибка одной записи не отменяла остальные
+            for item, future in zip(items, futures):
+                try:
+                    future.set_result(self.write_batch([item])[0])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def close(self):
+        """Перестает принимать записи, дописывает очередь и останавливает поток"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # В этом процессе записей не было - дописывать нечего
+        if self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join()